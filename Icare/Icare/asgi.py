@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Icare.settings')
 
 application = get_asgi_application()
+
+# Opt-in (settings.PREDICTION_PRELOAD): build the predictor here, before a
+# preloading server such as `gunicorn --preload` forks its workers
+from app.preload import preload  # noqa: E402
+
+preload()
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'app.middleware.ThemeMiddleware',
+    'app.middleware.WarmupMiddleware',
 ]
 
 ROOT_URLCONF = 'Icare.urls'
@@ -131,4 +132,62 @@ LOGIN_URL = 'login'
 
 # EmailJS Configuration
 # Get your public key from https://www.emailjs.com/docs/sdk/download/
-EMAILJS_PUBLIC_KEY = "wprnW6FeCgyij2v_e"
\ No newline at end of file
+EMAILJS_PUBLIC_KEY = "wprnW6FeCgyij2v_e"
+
+# Disease rule catalog: versioned JSON, hot-reloaded by every worker when the file changes
+DISEASE_RULES_PATH = BASE_DIR / 'app' / 'rules' / 'disease_rules.json'
+DISEASE_RULES_RELOAD_INTERVAL = 5  # seconds between catalog change checks
+
+# Precomputed feature normalization (build with: manage.py build_normalization)
+FEATURE_NORMALIZATION_PATH = BASE_DIR / 'app' / 'artifacts' / 'feature_normalization.json'
+
+# Rule scoring memoization: repeated vitals in an upload are scored once
+PREDICTION_DEDUPE_ROWS = True
+PREDICTION_QUANTIZE_VITALS = False  # snap to 1 year / 1 mg/dL / 0.5 mmHg before deduplicating
+PREDICTION_LUT_SIZE = 0  # scored profiles kept across uploads (0 disables the lookup table)
+PREDICTION_CHUNK_SIZE = 50000  # rows scored per chunk; bounds peak memory of large uploads
+PREDICTION_TIME_BUDGET = None  # opt-in, e.g. 20.0: seconds per dashboard upload before remaining rows use rules only
+PREDICTION_BUDGET_SLICE_ROWS = 64  # escalated rows sent to the model between time budget checks
+
+# Hugging Face medical NLP model
+# Model registry: logical name -> backend ('zero-shot' NLI cross-encoder or 'embedding' label similarity),
+# local checkpoint directory (loaded with local_files_only when present) and hub id, plus backend options
+HF_MODEL_DIR = BASE_DIR / 'models'
+HF_MODELS = {
+    'bart-large-mnli': {
+        'backend': 'zero-shot', 'path': HF_MODEL_DIR / 'bart-large-mnli', 'hub_id': 'facebook/bart-large-mnli',
+    },
+    # Distilled alternatives for hosts with less memory or tighter latency
+    'distilbart-mnli': {
+        'backend': 'zero-shot', 'path': HF_MODEL_DIR / 'distilbart-mnli-12-3', 'hub_id': 'valhalla/distilbart-mnli-12-3',
+    },
+    'minilm-nli': {
+        'backend': 'zero-shot', 'path': HF_MODEL_DIR / 'nli-MiniLM2-L6-H768', 'hub_id': 'cross-encoder/nli-MiniLM2-L6-H768',
+    },
+    'minilm-embedding': {
+        'backend': 'embedding', 'path': HF_MODEL_DIR / 'all-MiniLM-L6-v2', 'hub_id': 'sentence-transformers/all-MiniLM-L6-v2',
+        'calibration': (0.3, 10.0),  # (shift, scale): score = sigmoid(scale * (cosine - shift))
+    },
+}
+HF_MODEL_NAME = 'bart-large-mnli'  # registry entry this deployment loads
+HF_LOCAL_FILES_ONLY = False  # True on air-gapped hosts: hub ids load from the local cache only, never the network
+HF_PRECISION = 'fp32'  # 'fp32', 'int8' (dynamic quantization), 'bf16' (if the CPU supports it) or 'onnx'
+HF_BATCH_SIZE = 16  # per forward pass: (text, label) pairs for zero-shot, texts for embedding
+HF_MAX_BATCH_TOKENS = 8192  # padded tokens per length-bucketed forward pass; 0 keeps fixed HF_BATCH_SIZE batches
+HF_WARMUP = False  # warm up (and load the model) in the background from a worker's first request, e.g. /readyz
+HF_IDLE_TIMEOUT = 0  # seconds without text predictions before the model is released (0 keeps it loaded)
+PREDICTION_PRELOAD = False  # build the predictor in wsgi.py/asgi.py before the server forks (gunicorn --preload)
+PREDICTION_PRELOAD_MODEL = False  # with PREDICTION_PRELOAD, also load the NLP weights before the fork to share them
+HF_CACHE_ENABLED = True
+HF_CACHE_PATH = None  # memory only; e.g. '/var/cache/icare/zero_shot.sqlite3' shares results across workers
+HF_CACHE_MEMORY_ENTRIES = 10000  # in-process LRU entries
+HF_CACHE_MAX_BYTES = 64 * 1024 * 1024  # on-disk store size before least recently used entries are evicted
+# Opt-in cascade: set True to send only patients with a rule risk near a threshold to the model (much less
+# model time; patients far from a threshold keep their rule predictions, so results differ from scoring everyone)
+HF_CASCADE_MODE = False
+HF_CASCADE_BAND = 0.05  # distance from the 0.45/0.75 thresholds that counts as ambiguous
+HF_CANDIDATE_TOP_K = 0  # e.g. 4: model scores only the rule top-k (+ diseases named in notes); 0 scores all
+HF_MODEL_SERVER_SOCKET = None  # e.g. '/run/icare/model.sock': workers score through `manage.py run_model_server`
+HF_MODEL_SERVER_TIMEOUT = 30.0  # seconds a worker waits per request before keeping rule predictions
+HF_MODEL_SERVER_MAX_BATCH = 64  # texts per model call across workers, and per request a worker sends
+HF_MODEL_SERVER_MAX_WAIT_MS = 10  # how long the first request waits for others to join its model call
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Icare.settings')
 
 application = get_wsgi_application()
+
+# Opt-in (settings.PREDICTION_PRELOAD): build the predictor here, before a
+# preloading server such as `gunicorn --preload` forks its workers
+from app.preload import preload  # noqa: E402
+
+preload()
@@ -0,0 +1,128 @@
+"""
+Vectorized Aggregation of Batch Predictions
+One pass over the PredictionBatch arrays produces the risk-level totals, a
+disease x risk-level count matrix and each disease's worst instance. Aggregates
+of consecutive chunks merge into the same result as one large batch.
+"""
+
+import numpy as np
+
+from .prediction_batch import MISSING
+from .rule_engine import RISK_LEVELS
+
+
+class RiskAggregate:
+    """
+    Mergeable per-disease summary of predictions
+
+    Attributes:
+        patients: Number of patients aggregated
+        counts: Disease -> int array of instance counts per risk level (RISK_LEVELS order)
+        confidence_sums: Disease -> sum of confidences over all instances (for running means)
+        worst: Disease -> (risk code, confidence, prediction dict) of the highest
+               risk instance, then highest confidence; the first patient wins ties
+        first_seen: Disease -> (patient, position) where the disease first appears,
+                    which fixes the display order of equal-confidence diseases
+    """
+
+    def __init__(self):
+        self.patients = 0
+        self.counts = {}
+        self.confidence_sums = {}
+        self.worst = {}
+        self.first_seen = {}
+
+    @classmethod
+    def from_batch(cls, batch, offset=0):
+        """
+        Aggregate a PredictionBatch with array reductions
+
+        Args:
+            batch: PredictionBatch
+            offset: Index of the batch's first patient within the whole upload
+
+        Returns:
+            RiskAggregate instance
+        """
+        aggregate = cls()
+        aggregate.patients = len(batch)
+        if not len(batch):
+            return aggregate
+
+        risk_codes = batch.risk_codes.astype(np.int64)
+        present = risk_codes != MISSING
+        num_columns = risk_codes.shape[1]
+        num_levels = len(RISK_LEVELS)
+
+        # Disease x risk-level counts in a single bincount
+        cells = np.arange(num_columns) * num_levels + risk_codes
+        counts = np.bincount(cells[present], minlength=num_columns * num_levels).reshape(num_columns, num_levels)
+
+        confidence_sums = np.where(present, batch.confidence, 0).sum(axis=0, dtype=np.int64)
+
+        # Worst instance: argmax over (risk code, confidence) returns the first patient on ties
+        rank_keys = np.where(present, (risk_codes << 16) + batch.confidence, -1)
+        worst_rows = rank_keys.argmax(axis=0)
+
+        # First appearance: earliest patient with the disease, then its position in that patient's order
+        first_rows = present.argmax(axis=0)
+        positions = (batch.order[first_rows] == np.arange(num_columns)[:, np.newaxis]).argmax(axis=1)
+
+        for column in np.flatnonzero(present.any(axis=0)).tolist():
+            disease = batch.diseases[column]
+            row = int(worst_rows[column])
+            aggregate.counts[disease] = counts[column]
+            aggregate.confidence_sums[disease] = int(confidence_sums[column])
+            aggregate.worst[disease] = (
+                int(risk_codes[row, column]),
+                int(batch.confidence[row, column]),
+                batch.prediction(row, column),
+            )
+            aggregate.first_seen[disease] = (offset + int(first_rows[column]), int(positions[column]))
+        return aggregate
+
+    def merge(self, other):
+        """Fold in the aggregate of the patients that follow this one"""
+        for disease, counts in other.counts.items():
+            self.counts[disease] = self.counts[disease] + counts if disease in self.counts else counts
+        for disease, total in other.confidence_sums.items():
+            self.confidence_sums[disease] = self.confidence_sums.get(disease, 0) + total
+        for disease, worst in other.worst.items():
+            current = self.worst.get(disease)
+            # Strictly better only, so the earlier patient keeps ties
+            if current is None or worst[:2] > current[:2]:
+                self.worst[disease] = worst
+        for disease, seen in other.first_seen.items():
+            self.first_seen.setdefault(disease, seen)
+        self.patients += other.patients
+        return self
+
+    def risk_totals(self):
+        """Instance counts per risk level across all diseases, in RISK_LEVELS order"""
+        totals = np.zeros(len(RISK_LEVELS), dtype=np.int64)
+        for counts in self.counts.values():
+            totals += counts
+        return dict(zip(RISK_LEVELS, totals.tolist()))
+
+    def risk_matrix(self):
+        """Disease -> {risk level: patients}, in display order"""
+        return {
+            disease: dict(zip(RISK_LEVELS, self.counts[disease].tolist()))
+            for disease in sorted(self.counts, key=self.first_seen.get)
+        }
+
+    def mean_confidence(self):
+        """Disease -> mean confidence over all of its instances, in display order"""
+        return {
+            disease: round(self.confidence_sums[disease] / int(self.counts[disease].sum()), 2)
+            for disease in sorted(self.counts, key=self.first_seen.get)
+        }
+
+    def predictions(self):
+        """Worst instance of every disease, sorted by confidence (ties keep first appearance order)"""
+        diseases = sorted(self.worst, key=self.first_seen.get)
+        return sorted(
+            (self.worst[disease][2] for disease in diseases),
+            key=lambda x: x.get('confidence', 0),
+            reverse=True
+        )
@@ -209,6 +209,10 @@ DISEASE_PRECAUTIONS = {
 }
 
 
+# Lower-cased disease name -> DISEASE_PRECAUTIONS entry, for case-insensitive lookups
+PRECAUTION_INDEX = {disease_key.lower(): value for disease_key, value in DISEASE_PRECAUTIONS.items()}
+
+
 # Default precautions for diseases not specifically defined
 DEFAULT_PRECAUTIONS = {
     "icon": "⚕️",
@@ -252,10 +256,9 @@ def get_precautions_for_disease(disease_name: str) -> Dict:
     
     # Try case-insensitive exact match
     disease_name_lower = disease_name.lower()
-    for disease_key in DISEASE_PRECAUTIONS.keys():
-        if disease_key.lower() == disease_name_lower:
-            logger.debug(f"[PRECAUTIONS] Found case-insensitive match: {disease_name} -> {disease_key}")
-            return DISEASE_PRECAUTIONS[disease_key]
+    if disease_name_lower in PRECAUTION_INDEX:
+        logger.debug(f"[PRECAUTIONS] Found case-insensitive match: {disease_name}")
+        return PRECAUTION_INDEX[disease_name_lower]
     
     # Try partial match
     for disease_key in DISEASE_PRECAUTIONS.keys():
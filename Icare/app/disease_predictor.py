@@ -5,77 +5,343 @@ Disease Prediction using Hybrid Approach:
 """
 
 import os
+import ctypes
+import gc
+import importlib.util
+import itertools
+import threading
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 import logging
 import time
+import weakref
+
+from django.conf import settings
+
+from .aggregation import RiskAggregate
+from .feature_extraction import FEATURE_SCHEMA, extract_features, extract_record_features
+from .memoization import dedupe_rows, get_risk_lookup_table, score_profiles
+from .model_registry import resolve_model, selected_model_name
+from .model_server import RemoteMedicalPredictor
+from .nlp_backends import create_backend
+from .normalization import get_feature_normalizer
+from .prediction_batch import HF_MODEL, MODELS, PredictionBatch, extend_ranges
+from .rule_engine import get_rule_engine, risk_level
+from .time_budget import TimeBudget
+from .zero_shot_cache import cache_key, get_zero_shot_cache
 
 logger = logging.getLogger(__name__)
 
-# Try to import Hugging Face models
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-    HUGGINGFACE_AVAILABLE = True
+# Detect Hugging Face without importing it: transformers (and torch) are only
+# imported by nlp_backends when a model is actually loaded
+HUGGINGFACE_AVAILABLE = importlib.util.find_spec('transformers') is not None
+if HUGGINGFACE_AVAILABLE:
     logger.info("✓ Hugging Face transformers available")
-except ImportError:
-    HUGGINGFACE_AVAILABLE = False
+else:
     logger.warning("⚠️ Hugging Face transformers not installed. Using rule-based prediction only.")
 
 
+MEDICAL_DISEASES = [
+    "Diabetes - elevated blood glucose levels",
+    "Heart Disease - cardiovascular complications",
+    "Hypertension - high blood pressure",
+    "Kidney Disease - renal dysfunction",
+    "Thyroid Disorder - thyroid hormone imbalance",
+    "Asthma - chronic respiratory inflammation",
+    "Arthritis - joint inflammation",
+    "Stroke Risk - cerebrovascular accident risk",
+    "COPD - chronic obstructive pulmonary disease",
+    "Obesity - excessive body weight",
+    "Depression - major depressive disorder",
+    "Anxiety - anxiety disorder",
+    "Sleep Apnea - sleep-disordered breathing",
+    "Liver Disease - hepatic dysfunction",
+    "Cancer Risk - malignancy risk",
+]
+
+
+# Disease categories shown for every analysis (diseases without a prediction display as Low)
+DISEASE_CATEGORIES = (
+    "Diabetes",
+    "Heart Disease",
+    "Hypertension",
+    "Kidney Disease",
+    "Thyroid Disorder",
+    "Asthma",
+    "Arthritis",
+    "Cancer Risk",
+    "Stroke Risk",
+    "COPD",
+    "Obesity",
+    "Depression",
+    "Anxiety",
+    "Sleep Apnea",
+    "Liver Disease",
+)
+
+
+def nlp_backend_config(precision=None, model_name=None):
+    """
+    Configured NLP backend from the model registry (see model_registry.py)
+    
+    Args:
+        precision: Override for settings.HF_PRECISION
+        model_name: Override for settings.HF_MODEL_NAME
+    
+    Returns:
+        (backend name, local directory or hub id, backend options)
+    
+    Raises:
+        ValueError: For an unknown model name or a missing checkpoint
+    """
+    backend_name, model_id, options = resolve_model(model_name)
+    # 'fp32', 'int8' (dynamic quantization), 'bf16' or 'onnx' (ONNX Runtime)
+    options['precision'] = precision or options.get('precision') or getattr(settings, 'HF_PRECISION', 'fp32')
+    return backend_name, model_id, options
+
+
+# Seconds before a failed reload of an evicted model is retried
+RELOAD_RETRY_SECONDS = 60
+
+# Inputs of the throwaway predictions that warm the model and the rule path
+WARMUP_TEXT = "Patient age 55 years. Gender Male. Blood pressure 140/90. Glucose level 130 mg/dL."
+WARMUP_PATIENT = {'age': 55, 'gender': 'Male', 'blood_pressure': '140/90', 'cholesterol': 220, 'glucose': 130}
+
+
+def _release_memory():
+    """Collect a released model and return freed heap pages to the OS where glibc allows"""
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
 class HuggingFaceMedicalPredictor:
     """
     Advanced disease prediction using Hugging Face medical models
     Uses pre-trained medical NLP models for higher accuracy
+    
+    With loading='background' the model loads in a thread and callers keep
+    rule-based predictions until it is ready. With settings.HF_IDLE_TIMEOUT, a
+    model unused for that long is released; the next text prediction starts a
+    single background reload in the same way.
+    
+    'prefork' and 'deferred' are for a server master process that forks its
+    workers: no thread is started and no inference is run before the fork
+    (neither survives it). Each forked worker restarts its threads and then
+    primes the shared weights ('prefork') or loads its own copy ('deferred').
     """
     
-    def __init__(self):
-        """Initialize Hugging Face medical models"""
+    def __init__(self, loading='now'):
+        """
+        Initialize Hugging Face medical models
+        
+        Args:
+            loading: 'now' loads and primes the model before returning, 'background' does it in a
+                     thread, 'prefork' loads the weights without priming them, 'deferred' loads
+                     nothing until the process forks (or the first text prediction)
+        """
         self.models_loaded = False
-        self.zero_shot_classifier = None
-        self.medical_diseases = [
-            "Diabetes - elevated blood glucose levels",
-            "Heart Disease - cardiovascular complications",
-            "Hypertension - high blood pressure",
-            "Kidney Disease - renal dysfunction",
-            "Thyroid Disorder - thyroid hormone imbalance",
-            "Asthma - chronic respiratory inflammation",
-            "Arthritis - joint inflammation",
-            "Stroke Risk - cerebrovascular accident risk",
-            "COPD - chronic obstructive pulmonary disease",
-            "Obesity - excessive body weight",
-            "Depression - major depressive disorder",
-            "Anxiety - anxiety disorder",
-            "Sleep Apnea - sleep-disordered breathing",
-            "Liver Disease - hepatic dysfunction",
-            "Cancer Risk - malignancy risk",
-        ]
-        
-        if HUGGINGFACE_AVAILABLE:
-            self._load_models()
+        self.backend = None
+        self.evicted = False
+        self.idle_timeout = getattr(settings, 'HF_IDLE_TIMEOUT', 0)
+        self.last_used = time.monotonic()
+        self.lifecycle = {'loads': 0, 'load_failures': 0, 'evictions': 0, 'last_load_seconds': None}
+        self._lock = threading.Lock()
+        self._loading = False
+        self._load_done = threading.Event()
+        self._retry_after = 0.0
+        self._deferred = False
+        self._primed = False
+        # Logical name in the model registry (settings.HF_MODELS), chosen per deployment
+        self.model_name = selected_model_name()
+        try:
+            self.backend_name, self.model_id, self.backend_options = nlp_backend_config(model_name=self.model_name)
+        except ValueError as e:
+            logger.warning(f"⚠️ {e}")
+            logger.info("💡 Falling back to rule-based prediction")
+            self.backend_name, self.model_id = None, None
+            self.backend_options = {'precision': getattr(settings, 'HF_PRECISION', 'fp32')}
+            self.lifecycle['load_failures'] += 1
+            self._load_done.set()
+        self.precision = self.backend_options['precision']
+        # (text, label) pairs per forward pass when classifying many patients at once
+        self.batch_size = getattr(settings, 'HF_BATCH_SIZE', 16)
+        # Padded-token budget per forward pass for length-bucketed batches (0 keeps fixed-size batches)
+        self.max_batch_tokens = getattr(settings, 'HF_MAX_BATCH_TOKENS', 8192)
+        self.medical_diseases = tuple(MEDICAL_DISEASES)
+        
+        if HUGGINGFACE_AVAILABLE and self.backend_name:
+            if loading == 'background':
+                self._start_loading()
+            elif loading == 'deferred':
+                self._deferred = True
+            else:
+                self._load_models(prime=loading != 'prefork')
+                self._load_done.set()
+            if self.idle_timeout and loading not in ('prefork', 'deferred'):
+                self._start_idle_watcher()
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
     
-    def _load_models(self):
+    @property
+    def cache_id(self):
+        """Identity of the scoring model for result caching"""
+        return f"{self.backend_name}:{self.model_id}:{self.precision}"
+    
+    def _load_models(self, prime=True):
         """Load Hugging Face medical models"""
         try:
-            logger.info("🔄 Loading Hugging Face medical models...")
+            logger.info(
+                f"🔄 Loading Hugging Face medical model '{self.model_name}' "
+                f"({self.backend_name}: {self.model_id}, {self.precision})..."
+            )
             
-            # Use distilbert-based zero-shot classifier (lightweight and fast)
-            self.zero_shot_classifier = pipeline(
-                "zero-shot-classification",
-                model="facebook/bart-large-mnli",  # More accurate than distilbert
-                device=-1  # CPU by default, use GPU if available
+            start = time.perf_counter()
+            backend = create_backend(
+                self.backend_name, self.model_id, self.medical_diseases, **self.backend_options
             )
+            # bf16 falls back to fp32 on CPUs without bf16 kernels
+            self.precision = backend.precision
+            if prime:
+                self._prime(backend)
+            self.backend = backend
             
+            self.lifecycle['loads'] += 1
+            self.lifecycle['last_load_seconds'] = round(time.perf_counter() - start, 2)
+            self.last_used = time.monotonic()
+            self.evicted = False
+            self._deferred = False
             self.models_loaded = True
             logger.info("✓ Hugging Face medical models loaded successfully")
         except Exception as e:
+            self.lifecycle['load_failures'] += 1
             logger.warning(f"⚠️ Failed to load Hugging Face models: {e}")
             logger.info("💡 Falling back to rule-based prediction")
             self.models_loaded = False
     
+    def _prime(self, backend):
+        """One throwaway classification, so allocator and kernel warmup is not paid by the first request"""
+        try:
+            backend.classify([WARMUP_TEXT], self.medical_diseases, batch_size=self.batch_size)
+            self._primed = True
+        except Exception as e:
+            logger.warning(f"⚠️ Hugging Face warmup prediction failed: {e}")
+    
+    def ensure_loaded(self):
+        """
+        Whether the model can score right now
+        
+        An evicted or deferred model starts loading in the background (once,
+        however many requests ask); callers keep rule-based predictions meanwhile.
+        """
+        if self.models_loaded:
+            self.last_used = time.monotonic()
+            return True
+        if self.evicted or self._deferred:
+            self._start_loading()
+        return False
+    
+    def _start_loading(self):
+        with self._lock:
+            if self._loading or self.models_loaded or time.monotonic() < self._retry_after:
+                return
+            self._loading = True
+            self._load_done.clear()
+        threading.Thread(target=self._load_in_background, name='hf-model-load', daemon=True).start()
+    
+    def _load_in_background(self):
+        try:
+            self._load_models()
+        finally:
+            with self._lock:
+                self._loading = False
+                if not self.models_loaded:
+                    self._retry_after = time.monotonic() + RELOAD_RETRY_SECONDS
+            self._load_done.set()
+    
+    def wait_until_ready(self, timeout=None):
+        """Block until a background load finishes; returns whether the model is loaded"""
+        if self._deferred:
+            self._start_loading()
+        self._load_done.wait(timeout)
+        return self.models_loaded
+    
+    def status(self):
+        """'ready', 'loading', 'evicted' or 'deferred' (load on demand), 'failed' or 'disabled'"""
+        if self.models_loaded:
+            return 'ready'
+        if self._loading:
+            return 'loading'
+        if self.evicted:
+            return 'evicted'
+        if self._deferred:
+            return 'deferred'
+        return 'failed' if self.lifecycle['load_failures'] else 'disabled'
+    
+    def evict(self):
+        """
+        Release the model and its memory (it reloads on the next text prediction)
+        
+        Returns:
+            True if a loaded model was released
+        """
+        with self._lock:
+            if not self.models_loaded or self._loading:
+                return False
+            # Requests already holding the backend finish with it; new ones see it gone
+            self.models_loaded = False
+            self.backend = None
+            self.evicted = True
+            self.lifecycle['evictions'] += 1
+        _release_memory()
+        logger.info(f"💤 Hugging Face model released after {time.monotonic() - self.last_used:.0f}s idle")
+        return True
+    
+    def _start_idle_watcher(self):
+        threading.Thread(target=self._watch_idle, name='hf-idle-eviction', daemon=True).start()
+    
+    def _after_fork(self):
+        """
+        Runs in a forked child: only the forking thread is copied, so locks are
+        replaced and the watcher, an interrupted load and the priming restart here
+        """
+        was_loading = self._loading
+        self._lock = threading.Lock()
+        self._loading = False
+        self._load_done = threading.Event()
+        self._load_done.set()
+        if self.idle_timeout:
+            self._start_idle_watcher()
+        if self.models_loaded:
+            if not self._primed:
+                threading.Thread(
+                    target=self._prime, args=(self.backend,), name='hf-model-prime', daemon=True
+                ).start()
+        elif self._deferred or was_loading:
+            self._start_loading()
+    
+    def _watch_idle(self):
+        """Evict the model once it has been idle for idle_timeout seconds"""
+        interval = max(1.0, min(self.idle_timeout / 4, 60.0))
+        while True:
+            time.sleep(interval)
+            if self.models_loaded and time.monotonic() - self.last_used >= self.idle_timeout:
+                self.evict()
+    
+    def lifecycle_stats(self):
+        """Load/evict counters and current state"""
+        return {
+            **self.lifecycle,
+            'status': self.status(),
+            'idle_timeout': self.idle_timeout,
+            'idle_seconds': round(time.monotonic() - self.last_used, 1),
+        }
+    
     def predict_with_medical_nlp(self, medical_text):
         """
-        Use zero-shot classification for disease prediction
+        Use the configured NLP backend for disease prediction
         
         Args:
             medical_text: Clinical notes or symptoms
@@ -83,36 +349,118 @@ class HuggingFaceMedicalPredictor:
         Returns:
             Disease predictions with confidence scores
         """
-        if not self.models_loaded or not medical_text:
+        if not medical_text:
             return None
         
-        try:
-            logger.info(f"🏥 Processing with Hugging Face zero-shot classifier...")
-            
-            result = self.zero_shot_classifier(
-                medical_text,
-                self.medical_diseases,
-                multi_class=True
-            )
+        return self.predict_batch_with_medical_nlp([medical_text])[0]
+    
+    def predict_batch_with_medical_nlp(self, medical_texts, batch_size=None, candidates=None):
+        """
+        Zero-shot classification for many patients in batched pipeline calls
+        
+        Tokenization and forward passes are shared across patients instead of
+        invoking the pipeline once per row. Texts are bucketed by token length
+        so each forward pass is padded only to its own longest text.
+        
+        Args:
+            medical_texts: Clinical notes or symptoms, one per patient
+            batch_size: (text, label) pairs per forward pass (defaults to settings.HF_BATCH_SIZE)
+            candidates: Optional per-text lists of disease names to score; the
+                        model only evaluates those hypotheses (None scores all labels)
             
-            predictions = []
-            for disease, score in zip(result['labels'], result['scores']):
-                # Extract main disease name
-                disease_name = disease.split(' - ')[0]
-                confidence = int(score * 100)
+        Returns:
+            List with one sorted prediction list per text (None for empty texts or on failure)
+        """
+        results = [None] * len(medical_texts)
+        positions = [idx for idx, text in enumerate(medical_texts) if text]
+        # Held locally so an eviction during this call cannot pull the model away
+        backend = self.backend if self.ensure_loaded() else None
+        if backend is None or not positions:
+            return results
+        
+        batch_size = batch_size or self.batch_size
+        labels = {
+            idx: self._candidate_labels(candidates[idx] if candidates else None)
+            for idx in positions
+        }
+        cache = get_zero_shot_cache()
+        keys = {idx: cache_key(medical_texts[idx], labels[idx], self.cache_id) for idx in positions}
+        known = cache.get_many(list(dict.fromkeys(keys.values()))) if cache else {}
+        
+        # Each distinct uncached text goes through the model once, grouped by label set
+        pending = {}
+        for idx in positions:
+            group = pending.setdefault(labels[idx], {})
+            if keys[idx] not in known and keys[idx] not in group:
+                group[keys[idx]] = medical_texts[idx]
+        pending = {group_labels: texts for group_labels, texts in pending.items() if texts}
+        
+        for group_labels, texts in pending.items():
+            try:
+                logger.info(
+                    f"🏥 Processing {len(texts)} text(s) x {len(group_labels)} label(s) with "
+                    f"Hugging Face {self.backend_name} backend (batch size {batch_size}, "
+                    f"token budget {self.max_batch_tokens or 'off'})..."
+                )
                 
-                predictions.append({
-                    'disease': disease_name,
-                    'confidence': max(5, confidence),
-                    'risk': 'High' if score > 0.7 else ('Medium' if score > 0.4 else 'Low'),
-                    'model': 'Hugging Face'
-                })
+                outputs = backend.classify_batches(
+                    list(texts.values()),
+                    list(group_labels),
+                    batch_size=batch_size,
+                    max_tokens=self.max_batch_tokens or None,
+                )
+                fresh = dict(zip(texts, outputs))
+                known.update(fresh)
+                if cache:
+                    cache.set_many(fresh)
             
-            return sorted(predictions, key=lambda x: x['confidence'], reverse=True)
+            except Exception as e:
+                logger.error(f"Error in Hugging Face prediction: {e}")
         
-        except Exception as e:
-            logger.error(f"Error in Hugging Face prediction: {e}")
-            return None
+        for idx in positions:
+            result = known.get(keys[idx])
+            if result is not None:
+                results[idx] = self._format_predictions(result)
+        
+        self.last_used = time.monotonic()
+        return results
+    
+    def backend_stats(self):
+        """Load/evict, batching and result cache statistics of the backend"""
+        stats = {'nlp_lifecycle': self.lifecycle_stats()}
+        backend = self.backend
+        if backend is not None:
+            stats['nlp_backend'] = {'model_name': self.model_name, **backend.load_stats}
+            stats['nlp_batching'] = backend.batching_stats()
+        zero_shot_cache = get_zero_shot_cache()
+        if zero_shot_cache:
+            stats['zero_shot_cache'] = zero_shot_cache.stats()
+        return stats
+    
+    def _candidate_labels(self, diseases=None):
+        """Hypothesis labels for a subset of disease names, in canonical order (all labels by default)"""
+        if not diseases:
+            return tuple(self.medical_diseases)
+        wanted = set(diseases)
+        labels = tuple(label for label in self.medical_diseases if label.split(' - ')[0] in wanted)
+        return labels or tuple(self.medical_diseases)
+    
+    def _format_predictions(self, result):
+        """Convert one backend result ({'labels', 'scores'}) into sorted prediction dicts"""
+        predictions = []
+        for disease, score in zip(result['labels'], result['scores']):
+            # Extract main disease name
+            disease_name = disease.split(' - ')[0]
+            confidence = int(score * 100)
+            
+            predictions.append({
+                'disease': disease_name,
+                'confidence': max(5, confidence),
+                'risk': 'High' if score > 0.7 else ('Medium' if score > 0.4 else 'Low'),
+                'model': 'Hugging Face'
+            })
+        
+        return sorted(predictions, key=lambda x: x['confidence'], reverse=True)
 
 
 class DiseasePredictor:
@@ -120,39 +468,73 @@ class DiseasePredictor:
     Hybrid Disease Prediction System:
     - Uses Hugging Face models when available for high accuracy
     - Falls back to rule-based approach for speed
+    
+    Read-only after construction: per-request state lives in local variables,
+    the returned PredictionBatch and the caller's stats/time budget objects, so
+    one instance serves concurrent uploads from many threads.
     """
     
-    def __init__(self):
-        """Initialize the disease prediction model"""
-        self.classifier = None
-        self.hf_predictor = HuggingFaceMedicalPredictor() if HUGGINGFACE_AVAILABLE else None
+    def __init__(self, model_loading=None):
+        """
+        Initialize the disease prediction model
+        
+        Args:
+            model_loading: How the in-process NLP model loads (see HuggingFaceMedicalPredictor);
+                           defaults to 'background' with settings.HF_WARMUP, else 'now'
+        """
+        model_server_socket = getattr(settings, 'HF_MODEL_SERVER_SOCKET', None)
+        if model_server_socket:
+            # The model lives in the shared model server; this process loads none
+            self.hf_predictor = RemoteMedicalPredictor(
+                model_server_socket,
+                timeout=getattr(settings, 'HF_MODEL_SERVER_TIMEOUT', 30.0),
+                max_batch=getattr(settings, 'HF_MODEL_SERVER_MAX_BATCH', 64),
+            )
+        else:
+            # With HF_WARMUP the model loads in the background; predictions are rules-only until it is ready
+            if model_loading is None:
+                model_loading = 'background' if getattr(settings, 'HF_WARMUP', False) else 'now'
+            self.hf_predictor = HuggingFaceMedicalPredictor(loading=model_loading) if HUGGINGFACE_AVAILABLE else None
+        self.feature_schema = FEATURE_SCHEMA
         
         # Disease categories
-        self.disease_categories = [
-            "Diabetes",
-            "Heart Disease",
-            "Hypertension",
-            "Kidney Disease",
-            "Thyroid Disorder",
-            "Asthma",
-            "Arthritis",
-            "Cancer Risk",
-            "Stroke Risk",
-            "COPD",
-            "Obesity",
-            "Depression",
-            "Anxiety",
-            "Sleep Apnea",
-            "Liver Disease"
-        ]
-        
-        # Initialize scaler
-        self.scaler = StandardScaler()
-        self.fitted = False
+        self.disease_categories = DISEASE_CATEGORIES
+        
+        # Precomputed, versioned normalization shared read-only by every request
+        self.normalizer = get_feature_normalizer()
+        
+        # Repeated vitals are scored once per upload (see memoization.py)
+        self.memoize_rows = getattr(settings, 'PREDICTION_DEDUPE_ROWS', True)
+        self.quantize_vitals = getattr(settings, 'PREDICTION_QUANTIZE_VITALS', False)
+        
+        # Cascade (opt-in): only patients with a rule risk near a threshold go to the NLI model;
+        # off, every patient is scored by the model when it is loaded
+        self.cascade_mode = getattr(settings, 'HF_CASCADE_MODE', False)
+        self.cascade_band = getattr(settings, 'HF_CASCADE_BAND', 0.05)
+        
+        # Candidate pruning: the model only scores the rule top-k plus diseases named in the notes
+        self.candidate_top_k = getattr(settings, 'HF_CANDIDATE_TOP_K', 0)
+        # Escalated rows sent to the model between time budget checks
+        self.budget_slice_rows = getattr(settings, 'PREDICTION_BUDGET_SLICE_ROWS', 64)
         
         logger.info("✓ Disease Predictor initialized (Hybrid Mode)")
         logger.info(f"  - Rule-based: ✓ Available")
         logger.info(f"  - Hugging Face: {'✓ Available' if HUGGINGFACE_AVAILABLE else '✗ Not available'}")
+    
+    @property
+    def rule_engine(self):
+        """Active compiled rule catalog (hot-reloaded when the rules file changes)"""
+        return get_rule_engine()
+    
+    def warm_rule_path(self):
+        """
+        One rule-only prediction, building the rule tables and buffers without touching the model
+        
+        Returns:
+            PredictionBatch for WARMUP_PATIENT
+        """
+        raw_features = extract_features(self._to_frame([WARMUP_PATIENT]), self.feature_schema)
+        return self._rule_based_profiles(raw_features, self.rule_engine)
         
     def preprocess_medical_data(self, medical_data):
         """
@@ -165,30 +547,12 @@ class DiseasePredictor:
             Processed data ready for prediction
         """
         try:
-            # Convert to DataFrame if dict
-            if isinstance(medical_data, dict):
-                medical_data = pd.DataFrame([medical_data])
-            elif isinstance(medical_data, list):
-                medical_data = pd.DataFrame(medical_data)
-            
-            # Clean column names
-            medical_data.columns = [col.lower().strip() for col in medical_data.columns]
+            medical_data = self._to_frame(medical_data)
             
-            # Create feature matrix
-            features = []
+            # Build the feature matrix column by column from the schema
+            features_array = extract_features(medical_data, self.feature_schema)
             
-            for idx, row in medical_data.iterrows():
-                feature_vector = self._extract_features(row)
-                features.append(feature_vector)
-            
-            features_array = np.array(features)
-            
-            # Fit and transform
-            if not self.fitted:
-                self.scaler.fit(features_array)
-                self.fitted = True
-            
-            normalized_features = self.scaler.transform(features_array)
+            normalized_features = self.normalizer.transform(features_array)
             
             return normalized_features, medical_data
             
@@ -196,103 +560,154 @@ class DiseasePredictor:
             logger.error(f"Error preprocessing medical data: {e}")
             raise
     
+    def _to_frame(self, medical_data):
+        """DataFrame from a dict, list or DataFrame, with cleaned column names"""
+        # Convert to DataFrame if dict
+        if isinstance(medical_data, dict):
+            medical_data = pd.DataFrame([medical_data])
+        elif isinstance(medical_data, list):
+            medical_data = pd.DataFrame(medical_data)
+        
+        # Clean column names
+        medical_data.columns = [col.lower().strip() for col in medical_data.columns]
+        return medical_data
+    
     def _extract_features(self, row):
-        """Extract numerical features from medical record"""
-        features = []
-        
-        # Age (normalized 0-100)
-        try:
-            age = float(row.get('age', 50))
-            features.append(min(1.0, age / 100.0))
-        except (ValueError, TypeError):
-            features.append(0.5)
-        
-        # Gender (0=Female, 1=Male, 0.5=Other)
-        try:
-            gender = str(row.get('gender', 'M')).lower()
-            gender_value = 1.0 if gender in ['m', 'male'] else (0.0 if gender in ['f', 'female'] else 0.5)
-            features.append(gender_value)
-        except:
-            features.append(0.5)
-        
-        # Blood Pressure (systolic/diastolic -> average)
-        try:
-            bp = str(row.get('blood_pressure', '120/80'))
-            systolic, diastolic = map(float, bp.replace(' ', '').split('/'))
-            bp_avg = (systolic + diastolic) / 2 / 200.0
-            features.append(min(1.0, bp_avg))
-        except:
-            features.append(0.6)
-        
-        # Cholesterol (normalized)
-        try:
-            cholesterol = float(row.get('cholesterol', 200))
-            features.append(min(1.0, cholesterol / 300.0))
-        except (ValueError, TypeError):
-            features.append(0.5)
-        
-        # Glucose (normalized)
-        try:
-            glucose = float(row.get('glucose', 100))
-            features.append(min(1.0, glucose / 200.0))
-        except (ValueError, TypeError):
-            features.append(0.5)
-        
-        return features
+        """Extract numerical features from a single medical record"""
+        return extract_features(pd.DataFrame([dict(row)]), self.feature_schema)[0].tolist()
     
-    def predict_diseases(self, medical_data):
+    def predict_diseases(self, medical_data, rule_engine=None, stats=None, time_budget=None):
         """
         Predict disease risks from medical data
         Uses hybrid approach: Hugging Face for accuracy, rule-based for speed
         
         Args:
             medical_data: Medical information (dict, list, or DataFrame)
+            rule_engine: RuleEngine to score with (defaults to the active rule version)
+            stats: Optional dict filled with memoization counters
+            time_budget: Optional TimeBudget bounding the Hugging Face work
             
         Returns:
             List of predictions with confidence scores
         """
+        return self.predict_batch(
+            medical_data, rule_engine=rule_engine, stats=stats, time_budget=time_budget
+        ).to_dicts()
+    
+    def predict_batch(self, medical_data, rule_engine=None, stats=None, time_budget=None):
+        """
+        Predict disease risks into a compact PredictionBatch
+        
+        Args:
+            medical_data: Medical information (dict, list, or DataFrame)
+            rule_engine: RuleEngine to score with (defaults to the active rule version)
+            stats: Optional dict filled with memoization and cascade counters and the rows that fell back
+            time_budget: Optional TimeBudget; escalated rows go to the model in
+                         slices only while the next slice fits the budget
+            
+        Returns:
+            PredictionBatch with one row per patient
+        """
         try:
             start_time = time.time()
+            rule_engine = rule_engine or self.rule_engine
             
             # Preprocess data
-            features, original_data = self.preprocess_medical_data(medical_data)
+            original_data = self._to_frame(medical_data)
+            raw_features = extract_features(original_data, self.feature_schema)
             
-            predictions_list = []
+            # Score each distinct vitals profile once, in one vectorized pass
+            batch = self._rule_based_profiles(raw_features, rule_engine, stats)
             
-            for idx, feature_vector in enumerate(features):
-                # Try Hugging Face prediction first if clinical notes available
-                hf_predictions = None
-                if self.hf_predictor and self.hf_predictor.models_loaded:
-                    try:
-                        clinical_text = str(original_data.iloc[idx].get('clinical_notes', '')) or \
-                                       str(original_data.iloc[idx].get('details', '')) or \
-                                       self._generate_clinical_summary(original_data.iloc[idx])
-                        
-                        if clinical_text and len(clinical_text) > 10:
-                            logger.info(f"  📊 Using Hugging Face model for enhanced accuracy")
-                            hf_predictions = self.hf_predictor.predict_with_medical_nlp(clinical_text)
-                    except Exception as e:
-                        logger.warning(f"⚠️ Hugging Face prediction failed: {e}")
-                
-                # Use Hugging Face predictions if available, otherwise fall back to rule-based
-                if hf_predictions:
-                    disease_probs = hf_predictions
-                    logger.info(f"✓ Used Hugging Face model (high accuracy)")
+            # Use Hugging Face predictions where clinical notes allow, rule-based otherwise
+            escalated_rows = []
+            hf_rows = 0
+            fallback_rows = []
+            # An evicted model starts reloading here; this batch stays rule-based meanwhile
+            if self.hf_predictor and self.hf_predictor.ensure_loaded():
+                if self.cascade_mode:
+                    escalated_rows = np.flatnonzero(self._ambiguous_rows(batch, rule_engine)).tolist()
                 else:
-                    disease_probs = self._rule_based_prediction(feature_vector)
-                    logger.info(f"✓ Used rule-based model (fast)")
+                    escalated_rows = list(range(len(batch)))
                 
-                predictions_list.append(disease_probs)
+                # Without a time budget all escalated rows go to the model in one call
+                step = self.budget_slice_rows if time_budget is not None else max(len(escalated_rows), 1)
+                for start in range(0, len(escalated_rows), step):
+                    rows = escalated_rows[start:start + step]
+                    if time_budget is not None and not time_budget.allows(len(rows)):
+                        # Out of time: the rest keep the rule predictions already in the batch
+                        fallback_rows = escalated_rows[start:]
+                        logger.warning(
+                            f"⏱️ Time budget nearly used ({time_budget.elapsed():.2f}s of "
+                            f"{time_budget.seconds:.2f}s); {len(fallback_rows)} row(s) fall back to rule-based model"
+                        )
+                        break
+                    
+                    slice_start = time.monotonic()
+                    hf_rows += self._apply_hf_predictions(batch, original_data, rows)
+                    if time_budget is not None:
+                        time_budget.record(len(rows), time.monotonic() - slice_start)
+                
+                logger.info(
+                    f"✓ Escalated {len(escalated_rows)} of {len(batch)} row(s); used Hugging Face model "
+                    f"for {hf_rows}, rule-based model for {len(batch) - hf_rows}"
+                )
+            else:
+                logger.info(f"✓ Used rule-based model (fast) for {len(batch)} row(s)")
+            
+            if stats is not None:
+                stats['escalated_rows'] = len(escalated_rows)
+                stats['hf_rows'] = hf_rows
+                stats['fallback_rows'] = fallback_rows
             
             elapsed_time = time.time() - start_time
             logger.info(f"⏱️ Prediction completed in {elapsed_time:.2f} seconds")
             
-            return predictions_list
+            return batch
             
         except Exception as e:
             logger.error(f"Error in disease prediction: {e}")
             raise
     
+    def _apply_hf_predictions(self, batch, original_data, rows):
+        """
+        Score rows with the Hugging Face model and write the results into the batch
+        
+        Returns:
+            Number of rows the model scored
+        """
+        clinical_texts = [self._clinical_text(original_data.iloc[idx]) for idx in rows]
+        candidates = None
+        if self.candidate_top_k:
+            candidates = [
+                self._candidate_diseases(batch, idx, text)
+                for idx, text in zip(rows, clinical_texts)
+            ]
+        hf_results = self.hf_predictor.predict_batch_with_medical_nlp(clinical_texts, candidates=candidates)
+        
+        scored = 0
+        for idx, hf_predictions in zip(rows, hf_results):
+            if hf_predictions:
+                # Pruned rows keep rule predictions for the diseases the model skipped
+                if candidates:
+                    batch.merge_predictions(idx, hf_predictions, HF_MODEL)
+                else:
+                    batch.set_predictions(idx, hf_predictions, HF_MODEL)
+                scored += 1
+        return scored
+    
+    def _clinical_text(self, row):
+        """Clinical notes for the NLI model, or None when too short to be useful"""
+        try:
+            clinical_text = str(row.get('clinical_notes', '')) or \
+                           str(row.get('details', '')) or \
+                           self._generate_clinical_summary(row)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not build clinical text: {e}")
+            return None
+        
+        return clinical_text if clinical_text and len(clinical_text) > 10 else None
+    
     def _generate_clinical_summary(self, row):
         """Generate clinical summary from medical data for NLP analysis"""
         summary = []
@@ -319,330 +734,297 @@ class DiseasePredictor:
         except:
             return "Patient medical data"
     
-    def _generate_disease_reasoning(self, disease_name, risk_score, feature_vector, contributing_factors):
+    def _rule_based_prediction(self, feature_vector):
         """
-        Generate detailed clinical reasoning for why a disease was predicted
+        Improved rule-based disease prediction with medical accuracy
+        Uses clinical thresholds and validated risk algorithms
         
         Args:
-            disease_name: Name of the disease
-            risk_score: Risk score (0-1)
-            feature_vector: [age, gender, bp, cholesterol, glucose]
-            contributing_factors: Dict of factors and their contributions
+            feature_vector: Normalized features [age, gender, bp, cholesterol, glucose]
             
         Returns:
-            String explanation of the reasoning
+            Sorted list of disease predictions with contribution records
         """
-        age, gender, bp, cholesterol, glucose = feature_vector
-        
-        # Convert normalized values back to approximate clinical ranges
-        age_years = int(age * 100)
-        gender_str = "Male" if gender > 0.7 else ("Female" if gender < 0.3 else "Other")
-        bp_approx = int(bp * 200)
-        cholesterol_approx = int(cholesterol * 300)
-        glucose_approx = int(glucose * 200)
-        
-        reasoning = f"{disease_name} Risk Assessment:\n"
-        reasoning += f"Risk Score: {int(risk_score * 100)}% | "
-        reasoning += f"Risk Level: {'High' if risk_score > 0.75 else ('Medium' if risk_score > 0.45 else 'Low')}\n"
-        reasoning += f"Patient Profile: {age_years} years old, {gender_str}\n\n"
-        reasoning += "Contributing Factors:\n"
+        rule_engine = self.rule_engine
+        features = np.asarray(feature_vector, dtype=float).reshape(1, -1)
+        return PredictionBatch(rule_engine, rule_engine.evaluate(features), features).to_dicts()[0]
+    
+    def _candidate_diseases(self, batch, idx, clinical_text):
+        """Rule top-k diseases of one patient plus any disease named in the clinical text"""
+        diseases = [batch.diseases[column] for column in batch.order[idx, :self.candidate_top_k].tolist()]
+        if clinical_text:
+            text = clinical_text.lower()
+            diseases.extend(
+                disease for disease in batch.diseases
+                if disease not in diseases and disease.lower() in text
+            )
+        return diseases
+    
+    def _ambiguous_rows(self, batch, rule_engine):
+        """
+        Patients with any rule risk within cascade_band of a risk threshold
         
-        for factor, contribution in contributing_factors.items():
-            reasoning += f"• {factor}: {contribution}\n"
+        Clear-cut rule results (far from every threshold) are kept; only the
+        ambiguous rows are worth the cost of the NLI model.
         
-        return reasoning
+        Returns:
+            (N,) boolean array
+        """
+        thresholds = np.asarray(rule_engine.thresholds)
+        distance = np.abs(batch.profile_risks[:, :, np.newaxis] - thresholds)
+        ambiguous_profiles = (distance <= self.cascade_band).any(axis=(1, 2))
+        return ambiguous_profiles[batch.profile_index]
     
-    def _rule_based_prediction(self, feature_vector):
+    def _rule_based_profiles(self, raw_features, rule_engine, stats=None):
         """
-        Improved rule-based disease prediction with medical accuracy
-        Uses clinical thresholds and validated risk algorithms
+        Rule predictions for every row, scoring each distinct profile once
         
         Args:
-            feature_vector: Normalized features [age, gender, bp, cholesterol, glucose]
+            raw_features: (N x 5) feature matrix before normalization
+            rule_engine: RuleEngine to score with
+            stats: Optional dict updated with row, profile and lookup table counters
             
         Returns:
-            Sorted list of disease predictions with reasoning
+            PredictionBatch with every row scored by the rules
         """
-        age, gender, bp, cholesterol, glucose = feature_vector
-        
-        predictions = []
-        
-        # Convert to approximate clinical values for reasoning
-        age_years = int(age * 100)
-        bp_approx = int(bp * 200)
-        cholesterol_approx = int(cholesterol * 300)
-        glucose_approx = int(glucose * 200)
-        
-        # ========== METABOLIC DISEASES ==========
-        
-        # Diabetes risk - Based on fasting glucose levels
-        # Normal: <100, Prediabetes: 100-125, Diabetes: >125
-        diabetes_risk = min(1.0, glucose * 0.6 + age * 0.25 + cholesterol * 0.15)
-        diabetes_factors = {
-            f"Blood Glucose Level ({glucose_approx} mg/dL)": "60% contribution - Main indicator for diabetes" if glucose_approx > 100 else "Elevated glucose levels increase diabetes risk",
-            f"Age ({age_years} years)": "25% contribution - Age-related metabolic changes affect insulin sensitivity",
-            f"Cholesterol ({cholesterol_approx} mg/dL)": "15% contribution - Metabolic syndrome indicator"
-        }
-        predictions.append({
-            'disease': 'Diabetes',
-            'confidence': max(8, int(diabetes_risk * 100)),
-            'risk': 'High' if diabetes_risk > 0.75 else ('Medium' if diabetes_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Diabetes', diabetes_risk, feature_vector, diabetes_factors)
-        })
-        
-        # ========== CARDIOVASCULAR DISEASES ==========
-        
-        # Heart Disease risk - Framingham Risk Score factors
-        # Cholesterol, BP, age are primary factors
-        heart_risk = min(1.0, cholesterol * 0.45 + bp * 0.35 + age * 0.2)
-        heart_factors = {
-            f"Cholesterol ({cholesterol_approx} mg/dL)": "45% contribution - High cholesterol is a major cardiovascular risk factor",
-            f"Blood Pressure (~{bp_approx} mmHg)": "35% contribution - Elevated BP damages arterial walls and increases heart disease risk",
-            f"Age ({age_years} years)": "20% contribution - Cardiovascular risk increases with age"
-        }
-        predictions.append({
-            'disease': 'Heart Disease',
-            'confidence': max(8, int(heart_risk * 100)),
-            'risk': 'High' if heart_risk > 0.75 else ('Medium' if heart_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Heart Disease', heart_risk, feature_vector, heart_factors)
-        })
-        
-        # Hypertension risk - Primary cause of heart disease
-        # BP is the main factor
-        htn_risk = min(1.0, bp * 0.75 + age * 0.25)
-        htn_factors = {
-            f"Blood Pressure (~{bp_approx} mmHg)": "75% contribution - Primary indicator; >140/90 mmHg indicates hypertension",
-            f"Age ({age_years} years)": "25% contribution - HTension prevalence increases significantly with age"
-        }
-        predictions.append({
-            'disease': 'Hypertension',
-            'confidence': max(8, int(htn_risk * 100)),
-            'risk': 'High' if htn_risk > 0.75 else ('Medium' if htn_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Hypertension', htn_risk, feature_vector, htn_factors)
-        })
-        
-        # Stroke Risk - Related to BP, cholesterol, age
-        stroke_risk = min(1.0, bp * 0.40 + cholesterol * 0.35 + age * 0.25)
-        stroke_factors = {
-            f"Blood Pressure (~{bp_approx} mmHg)": "40% contribution - High BP is the leading stroke risk factor",
-            f"Cholesterol ({cholesterol_approx} mg/dL)": "35% contribution - Elevated cholesterol contributes to arterial plaque formation",
-            f"Age ({age_years} years)": "25% contribution - Stroke risk increases significantly after age 55"
-        }
-        predictions.append({
-            'disease': 'Stroke Risk',
-            'confidence': max(8, int(stroke_risk * 100)),
-            'risk': 'High' if stroke_risk > 0.75 else ('Medium' if stroke_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Stroke Risk', stroke_risk, feature_vector, stroke_factors)
-        })
-        
-        # ========== RENAL DISEASES ==========
-        
-        # Kidney Disease risk - Glucose and BP are key factors
-        kidney_risk = min(1.0, glucose * 0.45 + bp * 0.40 + age * 0.15)
-        kidney_factors = {
-            f"Blood Glucose ({glucose_approx} mg/dL)": "45% contribution - Diabetes is leading cause of kidney disease (diabetic nephropathy)",
-            f"Blood Pressure (~{bp_approx} mmHg)": "40% contribution - Hypertension damages kidney filtration units",
-            f"Age ({age_years} years)": "15% contribution - Kidney function naturally declines with age"
-        }
-        predictions.append({
-            'disease': 'Kidney Disease',
-            'confidence': max(8, int(kidney_risk * 100)),
-            'risk': 'High' if kidney_risk > 0.75 else ('Medium' if kidney_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Kidney Disease', kidney_risk, feature_vector, kidney_factors)
-        })
-        
-        # ========== ENDOCRINE DISORDERS ==========
-        
-        # Thyroid Disorder risk - Age and cholesterol imbalance
-        thyroid_risk = min(1.0, age * 0.35 + abs(cholesterol - 0.5) * 0.45 + 0.2)
-        thyroid_factors = {
-            f"Age ({age_years} years)": "35% contribution - Thyroid disorders more common in older adults",
-            f"Cholesterol Metabolism ({cholesterol_approx} mg/dL)": "45% contribution - Abnormal cholesterol levels suggest thyroid dysfunction",
-            "General Risk": "20% baseline - Population prevalence"
-        }
-        predictions.append({
-            'disease': 'Thyroid Disorder',
-            'confidence': max(8, int(thyroid_risk * 100)),
-            'risk': 'High' if thyroid_risk > 0.75 else ('Medium' if thyroid_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Thyroid Disorder', thyroid_risk, feature_vector, thyroid_factors)
-        })
-        
-        # ========== RESPIRATORY DISEASES ==========
-        
-        # Asthma risk - Age-dependent, common in children and older adults
-        asthma_risk = min(1.0, (1 - abs(age - 0.4)) * 0.4 + age * 0.2 + 0.4)
-        asthma_factors = {
-            f"Age Pattern ({age_years} years)": "60% contribution - Bimodal distribution (children and elderly have higher risk)",
-            "Age Factor": "20% contribution - Older age increases risk",
-            "Population Baseline": "20% baseline prevalence"
-        }
-        predictions.append({
-            'disease': 'Asthma',
-            'confidence': max(8, int(asthma_risk * 100)),
-            'risk': 'High' if asthma_risk > 0.75 else ('Medium' if asthma_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Asthma', asthma_risk, feature_vector, asthma_factors)
-        })
-        
-        # COPD risk - Strong age factor (older age = higher risk)
-        copd_risk = min(1.0, age * 0.65 + 0.15)
-        copd_factors = {
-            f"Age ({age_years} years)": "65% contribution - COPD is primarily age-related, especially >40 years",
-            "Baseline Risk": "15% population baseline"
-        }
-        predictions.append({
-            'disease': 'COPD',
-            'confidence': max(8, int(copd_risk * 100)),
-            'risk': 'High' if copd_risk > 0.75 else ('Medium' if copd_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('COPD', copd_risk, feature_vector, copd_factors)
-        })
-        
-        # Sleep Apnea risk - Related to age, weight (glucose proxy), and BP
-        sleep_apnea_risk = min(1.0, age * 0.35 + glucose * 0.35 + bp * 0.2 + 0.1)
-        sleep_factors = {
-            f"Age ({age_years} years)": "35% contribution - Sleep apnea increases with age, especially after 50",
-            f"Weight Indicator (via glucose {glucose_approx} mg/dL)": "35% contribution - Obesity is major risk factor",
-            f"Blood Pressure (~{bp_approx} mmHg)": "20% contribution - HTN and sleep apnea are closely linked",
-            "Baseline Risk": "10% population prevalence"
-        }
-        predictions.append({
-            'disease': 'Sleep Apnea',
-            'confidence': max(8, int(sleep_apnea_risk * 100)),
-            'risk': 'High' if sleep_apnea_risk > 0.75 else ('Medium' if sleep_apnea_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Sleep Apnea', sleep_apnea_risk, feature_vector, sleep_factors)
-        })
-        
-        # ========== METABOLIC DISORDERS ==========
-        
-        # Obesity risk - Glucose and cholesterol are metabolic markers
-        obesity_risk = min(1.0, glucose * 0.4 + cholesterol * 0.35 + 0.25)
-        obesity_factors = {
-            f"Blood Glucose ({glucose_approx} mg/dL)": "40% contribution - Elevated glucose indicates metabolic dysfunction",
-            f"Cholesterol ({cholesterol_approx} mg/dL)": "35% contribution - Dyslipidemia is marker of obesity",
-            "Baseline Risk": "25% population prevalence"
-        }
-        predictions.append({
-            'disease': 'Obesity',
-            'confidence': max(8, int(obesity_risk * 100)),
-            'risk': 'High' if obesity_risk > 0.75 else ('Medium' if obesity_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Obesity', obesity_risk, feature_vector, obesity_factors)
-        })
-        
-        # ========== MUSCULOSKELETAL DISEASES ==========
-        
-        # Arthritis risk - Strongly age-dependent
-        arthritis_risk = min(1.0, age * 0.85)
-        arthritis_factors = {
-            f"Age ({age_years} years)": "85% contribution - Osteoarthritis strongly correlated with age; risk significantly increases >50 years"
-        }
-        predictions.append({
-            'disease': 'Arthritis',
-            'confidence': max(8, int(arthritis_risk * 100)),
-            'risk': 'High' if arthritis_risk > 0.75 else ('Medium' if arthritis_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Arthritis', arthritis_risk, feature_vector, arthritis_factors)
-        })
-        
-        # ========== HEPATIC DISEASES ==========
-        
-        # Liver Disease risk - Cholesterol and glucose metabolism
-        liver_risk = min(1.0, glucose * 0.35 + cholesterol * 0.45 + age * 0.2)
-        liver_factors = {
-            f"Cholesterol ({cholesterol_approx} mg/dL)": "45% contribution - Liver disease causes cholesterol metabolism abnormalities",
-            f"Blood Glucose ({glucose_approx} mg/dL)": "35% contribution - Elevated glucose linked to fatty liver disease",
-            f"Age ({age_years} years)": "20% contribution - Liver disease risk increases with age"
-        }
-        predictions.append({
-            'disease': 'Liver Disease',
-            'confidence': max(8, int(liver_risk * 100)),
-            'risk': 'High' if liver_risk > 0.75 else ('Medium' if liver_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Liver Disease', liver_risk, feature_vector, liver_factors)
-        })
-        
-        # ========== MENTAL HEALTH DISORDERS ==========
-        
-        # Depression risk - Inversely related to age (more common in younger)
-        depression_risk = min(1.0, max(0.1, (0.6 - age * 0.3)) + 0.2)
-        depression_factors = {
-            f"Age ({age_years} years)": "Primary factor - Depression has U-shaped distribution (high in young and elderly)",
-            "General Risk": "20% baseline - Common mental health condition"
-        }
-        predictions.append({
-            'disease': 'Depression',
-            'confidence': max(8, int(depression_risk * 100)),
-            'risk': 'High' if depression_risk > 0.75 else ('Medium' if depression_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Depression', depression_risk, feature_vector, depression_factors)
-        })
-        
-        # Anxiety risk - Similar pattern to depression
-        anxiety_risk = min(1.0, max(0.1, (0.55 - age * 0.25)) + 0.2)
-        anxiety_factors = {
-            f"Age ({age_years} years)": "Primary factor - Anxiety disorders more prevalent in younger to middle-aged individuals",
-            "General Risk": "15% baseline - Anxiety is common mental health condition"
-        }
-        predictions.append({
-            'disease': 'Anxiety',
-            'confidence': max(8, int(anxiety_risk * 100)),
-            'risk': 'High' if anxiety_risk > 0.75 else ('Medium' if anxiety_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Anxiety', anxiety_risk, feature_vector, anxiety_factors)
-        })
-        
-        # ========== NEOPLASM RISK ==========
-        
-        # Cancer Risk - Age is primary factor, plus metabolic factors
-        cancer_risk = min(1.0, age * 0.55 + cholesterol * 0.25 + glucose * 0.1 + 0.1)
-        cancer_factors = {
-            f"Age ({age_years} years)": "55% contribution - Cancer risk increases exponentially with age, majority of cases >50 years",
-            f"Cholesterol ({cholesterol_approx} mg/dL)": "25% contribution - Elevated cholesterol linked to certain cancer types",
-            f"Metabolic Status (glucose {glucose_approx} mg/dL)": "10% contribution - Diabetes increases cancer risk",
-            "Baseline Risk": "10% population baseline"
-        }
-        predictions.append({
-            'disease': 'Cancer Risk',
-            'confidence': max(8, int(cancer_risk * 100)),
-            'risk': 'High' if cancer_risk > 0.75 else ('Medium' if cancer_risk > 0.45 else 'Low'),
-            'model': 'Rule-based',
-            'reasoning': self._generate_disease_reasoning('Cancer Risk', cancer_risk, feature_vector, cancer_factors)
-        })
-        
-        # Sort by confidence (descending)
-        predictions = sorted(predictions, key=lambda x: x['confidence'], reverse=True)
-        
-        return predictions
+        if self.memoize_rows:
+            profiles, keys, inverse = dedupe_rows(raw_features, quantize=self.quantize_vitals)
+        else:
+            profiles, keys, inverse = raw_features, raw_features, np.arange(len(raw_features))
+        
+        features = self.normalizer.transform(profiles)
+        table = get_risk_lookup_table()
+        namespace = (rule_engine.fingerprint, self.normalizer.version, self.quantize_vitals)
+        scores, lookup_hits = score_profiles(rule_engine, features, keys, namespace, table)
+        
+        if stats is not None:
+            rows = len(raw_features)
+            stats.update({
+                'rows': rows,
+                'unique_profiles': len(profiles),
+                'row_hit_rate': round(1 - len(profiles) / rows, 4) if rows else 0.0,
+                'lookup_hits': lookup_hits,
+                'lookup_misses': len(profiles) - lookup_hits if table else 0,
+                'quantized': self.quantize_vitals,
+            })
+        
+        return PredictionBatch(rule_engine, scores, features, inverse)
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
 
 
 def get_disease_predictor():
     """
     Get or create singleton instance of DiseasePredictor
     
+    Thread-safe: concurrent first requests build exactly one predictor.
+    
     Returns:
         DiseasePredictor instance
     """
-    if not hasattr(get_disease_predictor, '_instance'):
-        get_disease_predictor._instance = DiseasePredictor()
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = DiseasePredictor()
+    return _predictor
+
+
+_warmup_lock = threading.Lock()
+_warmup = {'started': False, 'rules_ready': False, 'seconds': None}
+
+
+def start_warmup():
+    """
+    Build the predictor and prime it in a background thread (once per process)
+    
+    The NLP model keeps loading in its own thread after the rule path is warm.
+    Called by WarmupMiddleware on a worker's first request (settings.HF_WARMUP),
+    or from a server hook that runs in the worker, e.g. gunicorn's post_fork.
+    Threads do not survive a fork, so never call it in a pre-fork master.
     
-    return get_disease_predictor._instance
+    Returns:
+        True if this call started the warmup
+    """
+    if _warmup['started']:
+        return False
+    with _warmup_lock:
+        if _warmup['started']:
+            return False
+        _warmup['started'] = True
+    threading.Thread(target=_warm_up, name='predictor-warmup', daemon=True).start()
+    return True
+
+
+def _warm_up():
+    try:
+        start = time.perf_counter()
+        predictor = get_disease_predictor()
+        # A first prediction allocates the rule path's buffers before real traffic arrives
+        predictor.predict_batch([WARMUP_PATIENT])
+        _warmup['seconds'] = round(time.perf_counter() - start, 2)
+        _warmup['rules_ready'] = True
+        logger.info(f"✓ Disease predictor warmed up in {_warmup['seconds']}s (NLP model: "
+                    f"{predictor.hf_predictor.status() if predictor.hf_predictor else 'disabled'})")
+    except Exception as e:
+        logger.warning(f"⚠️ Disease predictor warmup failed: {e}")
+
+
+def _reset_after_fork():
+    """Fresh locks in a forked child, and a warmup its parent left unfinished can start again"""
+    global _predictor_lock, _warmup_lock
+    # A parent thread holding either lock at the fork would leave it locked forever in the child
+    _predictor_lock = threading.Lock()
+    _warmup_lock = threading.Lock()
+    if not _warmup['rules_ready']:
+        # The parent's warmup thread did not survive the fork
+        _warmup['started'] = False
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def preload_predictor(load_model=False):
+    """
+    Build and warm the predictor singleton in a server master process before it forks
+    
+    Starts no thread and runs no model inference, so it is safe to fork afterwards.
+    
+    Args:
+        load_model: Also load the NLP weights here so every worker shares them;
+                    otherwise each worker loads its own copy right after the fork
+    
+    Returns:
+        The preloaded DiseasePredictor
+    """
+    global _predictor
+    start = time.perf_counter()
+    with _warmup_lock:
+        _warmup['started'] = True
+    with _predictor_lock:
+        if _predictor is None:
+            _predictor = DiseasePredictor(model_loading='prefork' if load_model else 'deferred')
+        predictor = _predictor
+    predictor.warm_rule_path()
+    _warmup['seconds'] = round(time.perf_counter() - start, 2)
+    _warmup['rules_ready'] = True
+    return predictor
+
+
+def readiness():
+    """
+    Load state for health checks (never builds the predictor or loads a model)
+    
+    Ready means the rule path is warm and the NLP model is not still loading; a
+    model that failed to load or is unavailable leaves the worker ready but
+    degraded (rules only).
+    
+    Returns:
+        Dict with 'ready', 'degraded', 'rules' and 'model' states
+    """
+    predictor = _predictor
+    # Without a warmup (HF_WARMUP off) everything loads lazily on the first upload
+    rules_ready = _warmup['rules_ready'] or not _warmup['started']
+    if predictor is None:
+        return {
+            'ready': rules_ready,
+            'degraded': False,
+            'rules': 'lazy' if rules_ready else 'warming',
+            'model': 'not loaded',
+            'warmup_seconds': None,
+        }
+    
+    hf_predictor = predictor.hf_predictor
+    # A remote predictor reports the model server's state ('unavailable' when it cannot be reached)
+    model = hf_predictor.status() if hf_predictor else 'disabled'
+    
+    state = {
+        'ready': rules_ready and model != 'loading',
+        'degraded': model in ('failed', 'unavailable'),
+        'rules': 'ready' if rules_ready else 'warming',
+        'model': model,
+        'warmup_seconds': _warmup['seconds'],
+    }
+    if hasattr(hf_predictor, 'lifecycle_stats'):
+        state['lifecycle'] = hf_predictor.lifecycle_stats()
+    return state
+
+
+def score_single_patient(record, rule_engine=None):
+    """
+    Rule-based risks for one patient using plain floats
+    
+    Skips DataFrame construction, the HF model and reasoning so interactive
+    "what if" requests stay well under a millisecond of CPU.
+    
+    Args:
+        record: Dict of vitals (age, gender, blood_pressure, cholesterol, glucose)
+        rule_engine: RuleEngine to score with (defaults to the active rule version)
+        
+    Returns:
+        List of {disease, confidence, risk, risk_score} dicts sorted by confidence
+    """
+    rule_engine = rule_engine or get_rule_engine()
+    features = get_feature_normalizer().transform_record(extract_record_features(record))
+    risks = rule_engine.score_record(features)
+    
+    predictions = [
+        {
+            'disease': disease,
+            'confidence': rule_engine.confidence_value(risk_score),
+            'risk': risk_level(risk_score, rule_engine.thresholds),
+            'risk_score': round(risk_score, 4),
+        }
+        for disease, risk_score in zip(rule_engine.diseases, risks)
+    ]
+    return sorted(predictions, key=lambda x: x['confidence'], reverse=True)
+
+
+def _iter_chunks(csv_data, chunk_size):
+    """Consecutive chunks of at most chunk_size rows from a list, DataFrame or any row iterable"""
+    if isinstance(csv_data, dict):
+        yield csv_data
+    elif isinstance(csv_data, pd.DataFrame):
+        for start in range(0, len(csv_data), chunk_size):
+            yield csv_data.iloc[start:start + chunk_size]
+    elif isinstance(csv_data, (list, tuple)):
+        for start in range(0, len(csv_data), chunk_size):
+            yield list(csv_data[start:start + chunk_size])
+    else:
+        rows = iter(csv_data)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
 
 
-def predict_from_csv(csv_data):
+def _merge_memo_stats(total, chunk):
+    """Add one chunk's memoization counters to the running totals"""
+    for key in ('rows', 'unique_profiles', 'lookup_hits', 'lookup_misses'):
+        total[key] = total.get(key, 0) + chunk.get(key, 0)
+    total['row_hit_rate'] = round(1 - total['unique_profiles'] / total['rows'], 4) if total['rows'] else 0.0
+    total['quantized'] = chunk.get('quantized', False)
+    total['chunks'] = total.get('chunks', 0) + 1
+
+
+def predict_from_csv(csv_data, chunk_size=None, time_budget=None):
     """
     Predict diseases from CSV data
     Handles multiple patients: counts all disease instances while aggregating for display
     
+    Rows are scored in fixed-size chunks whose aggregates are merged, so peak
+    memory depends on the chunk size rather than the upload size.
+    
     Args:
-        csv_data: List of dicts with medical information (multiple rows = multiple patients)
+        csv_data: List of dicts with medical information (multiple rows = multiple patients),
+                  or any iterable of row dicts (e.g. a csv.DictReader over a large file)
+        chunk_size: Rows per chunk (defaults to settings.PREDICTION_CHUNK_SIZE)
+        time_budget: Optional latency budget in seconds; once the Hugging Face
+                     model would overrun it, remaining patients keep their
+                     rule-based predictions (None or 0 for no limit)
         
     Returns:
         Predictions with statistics counting ALL instances across all patients
@@ -654,120 +1036,67 @@ def predict_from_csv(csv_data):
     try:
         predictor = get_disease_predictor()
         
+        # Pin one rule version for the whole upload, even if the catalog reloads mid-request
+        rule_engine = get_rule_engine()
+        
+        chunk_size = chunk_size or getattr(settings, 'PREDICTION_CHUNK_SIZE', 50000)
+        
         # Log input data
-        num_input_patients = len(csv_data) if isinstance(csv_data, (list, tuple)) else 1
-        logger.info(f"[DISEASE_PREDICTION] Input csv_data contains {num_input_patients} row(s)")
-        
-        all_patient_predictions = predictor.predict_diseases(csv_data)
-        
-        logger.info(f"[DISEASE_PREDICTION] Received predictions for {len(all_patient_predictions)} patient(s)")
-        logger.info(f"[DISEASE_PREDICTION] Type of all_patient_predictions: {type(all_patient_predictions)}")
-        logger.info(f"[DISEASE_PREDICTION] First element type: {type(all_patient_predictions[0]) if all_patient_predictions else 'N/A'}")
-        
-        # DEBUG: Check if predictions are properly formatted
-        if all_patient_predictions and isinstance(all_patient_predictions[0], dict):
-            # This means we got a single flat list, not a list of lists!
-            logger.warning(f"[DISEASE_PREDICTION] ⚠️ WARNING: All predictions in ONE list (not per-patient)!")
-            logger.warning(f"[DISEASE_PREDICTION]   - Expected: List of {num_input_patients} patient prediction lists")
-            logger.warning(f"[DISEASE_PREDICTION]   - Got: Single flat list with {len(all_patient_predictions)} disease predictions")
-            logger.warning(f"[DISEASE_PREDICTION] This means predict_diseases() returned wrong format - attempting conversion...")
-            # Convert single list to list of lists format
-            all_patient_predictions = [all_patient_predictions]
-            logger.info(f"[DISEASE_PREDICTION] Converting to multi-patient format: NOW {len(all_patient_predictions)} patient list(s)")
+        num_input_patients = len(csv_data) if isinstance(csv_data, (list, tuple)) else None
+        if num_input_patients is not None:
+            logger.info(f"[DISEASE_PREDICTION] Input csv_data contains {num_input_patients} row(s)")
+        else:
+            logger.info(f"[DISEASE_PREDICTION] Streaming input in chunks of {chunk_size} row(s)")
+        
+        budget = TimeBudget(time_budget) if time_budget else None
+        
+        aggregate = RiskAggregate()
+        memo_stats = {}
+        cascade_stats = {'escalated_rows': 0, 'hf_rows': 0}
+        model_rows = np.zeros(len(MODELS), dtype=np.int64)
+        model_row_ranges = {}
+        
+        for chunk in _iter_chunks(csv_data, chunk_size):
+            chunk_stats = {}
+            batch = predictor.predict_batch(chunk, rule_engine=rule_engine, stats=chunk_stats, time_budget=budget)
+            offset = aggregate.patients
+            aggregate.merge(RiskAggregate.from_batch(batch, offset=offset))
+            model_rows += np.bincount(batch.model_codes, minlength=len(MODELS))
+            for model, ranges in batch.model_row_ranges(offset).items():
+                extend_ranges(model_row_ranges.setdefault(model, []), ranges)
+            for key in cascade_stats:
+                cascade_stats[key] += chunk_stats.pop(key, 0)
+            fallback_rows = chunk_stats.pop('fallback_rows', [])
+            if budget is not None:
+                budget.fall_back([offset + row for row in fallback_rows])
+            _merge_memo_stats(memo_stats, chunk_stats)
+            logger.info(f"[DISEASE_PREDICTION] Chunk {memo_stats['chunks']}: {len(batch)} row(s), {aggregate.patients} so far")
+        
+        total_patients = aggregate.patients
+        logger.info(
+            f"[DISEASE_PREDICTION] Memoization: {memo_stats.get('rows', 0)} row(s) -> "
+            f"{memo_stats.get('unique_profiles', 0)} unique profile(s), "
+            f"row hit rate {memo_stats.get('row_hit_rate', 0.0):.1%}, "
+            f"lookup hits {memo_stats.get('lookup_hits', 0)}"
+        )
         
         # VALIDATION: Check if output matches input
-        if len(all_patient_predictions) != num_input_patients:
-            logger.warning(f"[DISEASE_PREDICTION] ⚠️ MISMATCH: Input had {num_input_patients} patients, but got {len(all_patient_predictions)} prediction lists")
-            logger.warning(f"[DISEASE_PREDICTION]    This might indicate a format issue or bug in predict_diseases()")
+        if num_input_patients is not None and total_patients != num_input_patients:
+            logger.warning(f"[DISEASE_PREDICTION] ⚠️ MISMATCH: Input had {num_input_patients} patients, but got {total_patients} prediction rows")
         
         # IMPORTANT: Count ALL disease instances across ALL patients
         # This means: if 15 patients each have High-risk Diabetes = 15 high-risk count
         # (not 1 high-risk count after de-duplication)
+        # Each chunk is reduced in one vectorized pass to per-disease x risk-level
+        # counts and, for display, each disease once with its highest risk/confidence instance
+        totals = aggregate.risk_totals()
+        total_high_risk_instances = totals['High']
+        total_medium_risk_instances = totals['Medium']
+        total_low_risk_instances = totals['Low']
         
-        # Step 1: Count ALL instances by risk level (including duplicates across patients)
-        total_high_risk_instances = 0
-        total_medium_risk_instances = 0
-        total_low_risk_instances = 0
-        
-        logger.info(f"[DISEASE_PREDICTION] ============ STEP 1: COUNT ALL INSTANCES ============")
-        logger.info(f"[DISEASE_PREDICTION] Processing {len(all_patient_predictions)} patient(s)...")
-        
-        if len(all_patient_predictions) != num_input_patients:
-            logger.error(f"[DISEASE_PREDICTION] ❌ CRITICAL: Patient count mismatch after format check:")
-            logger.error(f"[DISEASE_PREDICTION]    - Input: {num_input_patients} patients")
-            logger.error(f"[DISEASE_PREDICTION]    - Processing: {len(all_patient_predictions)} patient lists")
-            logger.error(f"[DISEASE_PREDICTION]    - This will cause incorrect counting!")
-        
-        total_diseases_counted = 0
-        
-        for patient_idx, patient_predictions_raw in enumerate(all_patient_predictions):
-            # Ensure patient_predictions is always a list
-            if isinstance(patient_predictions_raw, list):
-                patient_predictions = patient_predictions_raw
-                logger.info(f"[DISEASE_PREDICTION]   Patient {patient_idx + 1}: {len(patient_predictions)} diseases predicted")
-            elif isinstance(patient_predictions_raw, dict):
-                patient_predictions = [patient_predictions_raw]
-                logger.warning(f"[DISEASE_PREDICTION]   ⚠️ Patient {patient_idx + 1}: Single prediction dict, wrapping in list")
-            else:
-                logger.error(f"[DISEASE_PREDICTION]   ❌ Patient {patient_idx + 1}: Invalid format - {type(patient_predictions_raw)}")
-                patient_predictions = []
-            
-            for pred in patient_predictions:
-                total_diseases_counted += 1
-                risk_level = pred.get('risk', 'Low')
-                if risk_level == 'High':
-                    total_high_risk_instances += 1
-                elif risk_level == 'Medium':
-                    total_medium_risk_instances += 1
-                else:
-                    total_low_risk_instances += 1
-        
-        logger.info(f"[DISEASE_PREDICTION] STEP 1 COMPLETE:")
-        logger.info(f"[DISEASE_PREDICTION]   - Total diseases processed: {total_diseases_counted}")
-        logger.info(f"[DISEASE_PREDICTION]   - High-risk: {total_high_risk_instances}")
-        logger.info(f"[DISEASE_PREDICTION]   - Medium-risk: {total_medium_risk_instances}")
-        logger.info(f"[DISEASE_PREDICTION]   - Low-risk: {total_low_risk_instances}")
-        
-        # Step 2: Create unique aggregated predictions for display
-        # (showing each disease once with highest risk/confidence)
-        aggregated_predictions = {}
-        
-        for patient_idx, patient_predictions_raw in enumerate(all_patient_predictions):
-            # Ensure patient_predictions is always a list
-            if isinstance(patient_predictions_raw, list):
-                patient_predictions = patient_predictions_raw
-            elif isinstance(patient_predictions_raw, dict):
-                patient_predictions = [patient_predictions_raw]
-            else:
-                patient_predictions = []
-            
-            for pred in patient_predictions:
-                disease_name = pred.get('disease', 'Unknown')
-                
-                if disease_name in aggregated_predictions:
-                    existing = aggregated_predictions[disease_name]
-                    # Risk hierarchy: High > Medium > Low
-                    risk_levels = {'High': 3, 'Medium': 2, 'Low': 1}
-                    existing_risk_score = risk_levels.get(existing.get('risk'), 0)
-                    new_risk_score = risk_levels.get(pred.get('risk'), 0)
-                    
-                    # Keep the one with higher risk, or higher confidence if same risk
-                    if new_risk_score > existing_risk_score or \
-                       (new_risk_score == existing_risk_score and pred.get('confidence', 0) > existing.get('confidence', 0)):
-                        aggregated_predictions[disease_name] = pred
-                        logger.debug(f"  Updated {disease_name}: {existing.get('risk')} → {pred.get('risk')}")
-                else:
-                    aggregated_predictions[disease_name] = pred
-                    logger.debug(f"  Added {disease_name}: {pred.get('risk')}")
-        
-        # Sort by confidence
-        final_predictions = sorted(
-            aggregated_predictions.values(),
-            key=lambda x: x.get('confidence', 0),
-            reverse=True
-        )
+        final_predictions = aggregate.predictions()
         
-        # Step 3: Calculate other statistics from the unique disease list
+        # Calculate other statistics from the unique disease list
         total_unique_diseases = len(final_predictions)
         unique_high_risk = sum(1 for p in final_predictions if p.get('risk') == 'High')
         unique_medium_risk = sum(1 for p in final_predictions if p.get('risk') == 'Medium')
@@ -778,19 +1107,12 @@ def predict_from_csv(csv_data):
             if final_predictions else 0
         )
         
-        logger.info(f"[DISEASE_PREDICTION] ✓ Analysis complete:")
-        logger.info(f"  - Total patients: {len(all_patient_predictions)}")
-        logger.info(f"  - Unique diseases: {total_unique_diseases}")
-        logger.info(f"  - ALL INSTANCES (for counting):")
-        logger.info(f"    - High risk instances: {total_high_risk_instances}")
-        logger.info(f"    - Medium risk instances: {total_medium_risk_instances}")
-        logger.info(f"    - Low risk instances: {total_low_risk_instances}")
-        logger.info(f"    - Total instances: {total_high_risk_instances + total_medium_risk_instances + total_low_risk_instances}")
-        logger.info(f"  - Unique (for display):")
-        logger.info(f"    - High risk: {unique_high_risk}")
-        logger.info(f"    - Medium risk: {unique_medium_risk}")
-        logger.info(f"    - Low risk: {unique_low_risk}")
-        logger.info(f"  - Average confidence: {avg_confidence:.2f}%")
+        logger.info(
+            f"[DISEASE_PREDICTION] ✓ Analysis complete: {total_patients} patient(s), "
+            f"{total_unique_diseases} unique disease(s), instances High/Medium/Low = "
+            f"{total_high_risk_instances}/{total_medium_risk_instances}/{total_low_risk_instances}, "
+            f"average confidence {avg_confidence:.2f}%"
+        )
         
         result = {
             'predictions': final_predictions,
@@ -800,18 +1122,36 @@ def predict_from_csv(csv_data):
             'low_risk_count': total_low_risk_instances,  # COUNT ALL instances
             'avg_confidence': round(avg_confidence, 2),
             # Additional fields for reference
-            'total_patients': len(all_patient_predictions),
+            'total_patients': total_patients,
             'unique_high_risk': unique_high_risk,
             'unique_medium_risk': unique_medium_risk,
             'unique_low_risk': unique_low_risk,
+            'risk_matrix': aggregate.risk_matrix(),  # Disease -> patients per risk level
+            'mean_confidence_by_disease': aggregate.mean_confidence(),  # Over ALL instances
+            'rule_version': rule_engine.version,
+            'normalization_version': predictor.normalizer.version,
+            'memoization': memo_stats,
+            'models': dict(zip(MODELS, model_rows.tolist())),  # Patients scored by each model
+            'model_row_ranges': model_row_ranges,  # Which rows each model scored, as [start, end) ranges
         }
         
-        # Validation: Ensure total instance counts are correct
-        total_instances = total_high_risk_instances + total_medium_risk_instances + total_low_risk_instances
-        expected_total = len(all_patient_predictions) * 15  # Assuming ~15 diseases per patient
-        logger.info(f"[DISEASE_PREDICTION] ✓ Validation:")
-        logger.info(f"  - Total predictions/instances: {total_instances}")
-        logger.info(f"  - Expected (patients × ~15 diseases): ~{expected_total}")
+        if budget is not None:
+            result['time_budget'] = budget.report()
+            logger.info(
+                f"[DISEASE_PREDICTION] Time budget: {result['time_budget']['elapsed_seconds']}s of "
+                f"{budget.seconds}s used, {budget.fallback_rows} row(s) fell back to rule-based model"
+            )
+        
+        if predictor.hf_predictor and predictor.hf_predictor.models_loaded:
+            result['cascade'] = {
+                'enabled': predictor.cascade_mode,
+                'band': predictor.cascade_band,
+                'escalated_rows': cascade_stats['escalated_rows'],
+                'hf_rows': cascade_stats['hf_rows'],
+                'escalation_rate': round(cascade_stats['escalated_rows'] / total_patients, 4) if total_patients else 0.0,
+            }
+            # Backend load, batching and cache statistics (from the model server when one is used)
+            result.update(predictor.hf_predictor.backend_stats())
         
         return result
         
@@ -0,0 +1,160 @@
+"""
+Columnar, Schema-Driven Feature Extraction
+Builds each feature in one vectorized pass over its whole column instead of
+looping over DataFrame rows. How each column is parsed lives in the schema;
+the normalizer and the rule engine expect exactly the five FEATURE_SCHEMA
+features, in order.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Each entry describes how one CSV column becomes one normalized feature:
+#   column  - CSV column name (lower-case)
+#   parser  - 'numeric', 'category' or 'ratio' (e.g. "systolic/diastolic")
+#   scale   - divisor applied to the parsed value
+#   cap     - upper bound of the normalized value
+#   missing - raw value used when the column is absent from the upload
+#   invalid - normalized value used when a cell cannot be parsed
+#   mapping - lower-cased category -> value (category parser only)
+FEATURE_SCHEMA = [
+    {'name': 'age', 'column': 'age', 'parser': 'numeric', 'scale': 100.0, 'cap': 1.0,
+     'missing': 50, 'invalid': 0.5},
+    {'name': 'gender', 'column': 'gender', 'parser': 'category',
+     'mapping': {'m': 1.0, 'male': 1.0, 'f': 0.0, 'female': 0.0},
+     'missing': 'M', 'invalid': 0.5},
+    {'name': 'bp', 'column': 'blood_pressure', 'parser': 'ratio', 'scale': 200.0, 'cap': 1.0,
+     'missing': '120/80', 'invalid': 0.6},
+    {'name': 'cholesterol', 'column': 'cholesterol', 'parser': 'numeric', 'scale': 300.0, 'cap': 1.0,
+     'missing': 200, 'invalid': 0.5},
+    {'name': 'glucose', 'column': 'glucose', 'parser': 'numeric', 'scale': 200.0, 'cap': 1.0,
+     'missing': 100, 'invalid': 0.5},
+]
+
+
+def _parse_numeric(values, spec):
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valid = ~np.isnan(numbers)
+    return np.fmin(numbers / spec['scale'], spec['cap']), valid
+
+
+def _parse_ratio(values, spec):
+    # "systolic/diastolic" -> mean of both sides (spaces are ignored)
+    text = values.astype(str).str.replace(' ', '', regex=False)
+    parts = text.str.partition('/')
+    single_separator = (text.str.count('/') == 1).fillna(False).to_numpy(dtype=bool)
+    systolic = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    diastolic = pd.to_numeric(parts[2], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    average = (systolic + diastolic) / 2 / spec['scale']
+    valid = single_separator & ~np.isnan(average)
+    return np.fmin(average, spec['cap']), valid
+
+
+def _parse_category(values, spec):
+    mapped = values.astype(str).str.lower().map(spec['mapping'])
+    numbers = pd.to_numeric(mapped, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return numbers, ~np.isnan(numbers)
+
+
+PARSERS = {
+    'numeric': _parse_numeric,
+    'ratio': _parse_ratio,
+    'category': _parse_category,
+}
+
+
+def _column_values(data, column, default):
+    """Column as a Series; duplicate columns are coalesced, absent ones use the default"""
+    if column not in data.columns:
+        return pd.Series([default] * len(data), index=data.index, dtype=object)
+
+    values = data[column]
+    if isinstance(values, pd.DataFrame):
+        # Same name after lower-casing (e.g. "Age" and "age"): first non-empty cell wins
+        values = values.replace('', np.nan).bfill(axis=1).iloc[:, 0]
+    return values
+
+
+def extract_features(data, schema=None):
+    """
+    Build the normalized feature matrix column by column
+
+    Args:
+        data: DataFrame with lower-cased column names
+        schema: List of feature specs (defaults to FEATURE_SCHEMA)
+
+    Returns:
+        (N x len(schema)) float array
+    """
+    schema = FEATURE_SCHEMA if schema is None else schema
+    features = np.empty((len(data), len(schema)))
+
+    for idx, spec in enumerate(schema):
+        values = _column_values(data, spec['column'], spec['missing'])
+        parsed, valid = PARSERS[spec['parser']](values, spec)
+        features[:, idx] = np.where(valid, parsed, spec['invalid'])
+
+    return features
+
+
+def _scalar_numeric(value, spec):
+    number = float(value)
+    return min(number / spec['scale'], spec['cap']) if number == number else None
+
+
+def _scalar_ratio(value, spec):
+    text = str(value).replace(' ', '')
+    if text.count('/') != 1:
+        return None
+    systolic, diastolic = map(float, text.split('/'))
+    average = (systolic + diastolic) / 2 / spec['scale']
+    return min(average, spec['cap']) if average == average else None
+
+
+def _scalar_category(value, spec):
+    return spec['mapping'].get(str(value).lower())
+
+
+SCALAR_PARSERS = {
+    'numeric': _scalar_numeric,
+    'ratio': _scalar_ratio,
+    'category': _scalar_category,
+}
+
+
+def extract_record_features(record, schema=None):
+    """
+    Feature vector for a single record using plain floats (no pandas)
+
+    Same semantics as extract_features() for one row, for latency-sensitive
+    single-patient scoring.
+
+    Args:
+        record: Dict of raw values keyed by column name
+        schema: List of feature specs (defaults to FEATURE_SCHEMA)
+
+    Returns:
+        List of floats, one per schema entry
+    """
+    schema = FEATURE_SCHEMA if schema is None else schema
+    normalized = {}
+    for key, value in record.items():
+        column = str(key).lower().strip()
+        # Same name after lower-casing (e.g. "Age" and "age"): first non-empty value wins
+        if normalized.get(column) in (None, ''):
+            normalized[column] = value
+
+    features = []
+    for spec in schema:
+        value = normalized.get(spec['column'], spec['missing'])
+        try:
+            parsed = SCALAR_PARSERS[spec['parser']](value, spec)
+        except (ValueError, TypeError):
+            parsed = None
+        features.append(spec['invalid'] if parsed is None else parsed)
+    return features
+
+
+def feature_names(schema=None):
+    """Names of the feature columns produced by extract_features"""
+    return [spec['name'] for spec in (FEATURE_SCHEMA if schema is None else schema)]
@@ -0,0 +1,55 @@
+"""
+Analyse a (possibly very large) patient CSV file in bounded memory
+
+Usage:
+    python manage.py analyze_csv patients.csv --chunk-size 50000 --time-budget 30
+"""
+
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.disease_predictor import get_disease_predictor, predict_from_csv
+
+
+class Command(BaseCommand):
+    help = 'Stream a patient CSV file through disease prediction chunk by chunk and print the summary as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with patient vitals')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Rows scored per chunk (defaults to settings.PREDICTION_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=None,
+            help='Seconds before remaining rows fall back to rule-based prediction (default: no limit)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['csv_file']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        # With HF_WARMUP the model loads in the background; wait so the run is not rules-only
+        hf_predictor = get_disease_predictor().hf_predictor
+        if hf_predictor and hasattr(hf_predictor, 'wait_until_ready'):
+            hf_predictor.wait_until_ready()
+
+        with open(path, encoding='utf-8', newline='') as f:
+            # The DictReader is consumed lazily, one chunk at a time
+            result = predict_from_csv(
+                csv.DictReader(f),
+                chunk_size=options['chunk_size'],
+                time_budget=options['time_budget'],
+            )
+
+        for prediction in result['predictions']:
+            prediction.pop('contributions', None)
+        self.stdout.write(json.dumps(result, indent=2))
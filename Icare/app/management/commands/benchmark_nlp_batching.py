@@ -0,0 +1,80 @@
+"""
+Measure length-bucketed batching against fixed-size batches in input order
+
+Usage:
+    python manage.py benchmark_nlp_batching patients.csv --limit 500 --max-tokens 8192
+"""
+
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.disease_predictor import get_disease_predictor
+
+
+class Command(BaseCommand):
+    help = 'Classify clinical texts with unsorted and length-bucketed batches and compare time and padding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with patient vitals or clinical notes')
+        parser.add_argument('--limit', type=int, default=200, help='Patients classified')
+        parser.add_argument(
+            '--max-tokens',
+            type=int,
+            default=None,
+            help='Padded-token budget per forward pass (defaults to settings.HF_MAX_BATCH_TOKENS)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['csv_file']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        predictor = get_disease_predictor()
+        hf_predictor = predictor.hf_predictor
+        if hf_predictor and hasattr(hf_predictor, 'wait_until_ready'):
+            hf_predictor.wait_until_ready()
+        if not (hf_predictor and hf_predictor.models_loaded and getattr(hf_predictor, 'backend', None)):
+            raise CommandError('Hugging Face model is not loaded in this process (run it where the model is loaded)')
+
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = [row for _, row in zip(range(options['limit']), csv.DictReader(f))]
+        frame = predictor._to_frame(rows)
+        texts = [text for text in (predictor._clinical_text(row) for _, row in frame.iterrows()) if text]
+        if not texts:
+            raise CommandError('No clinical texts could be built from the file')
+
+        backend = hf_predictor.backend
+        labels = hf_predictor.medical_diseases
+        max_tokens = options['max_tokens'] or hf_predictor.max_batch_tokens or 8192
+
+        report = {'texts': len(texts), 'max_tokens': max_tokens}
+        outputs = {}
+        for mode, budget in (('unsorted', None), ('bucketed', max_tokens)):
+            before = backend.batching_stats()
+            start = time.perf_counter()
+            outputs[mode] = backend.classify_batches(texts, labels, batch_size=hf_predictor.batch_size, max_tokens=budget)
+            elapsed = time.perf_counter() - start
+            after = backend.batching_stats()
+            report[mode] = {
+                'seconds': round(elapsed, 3),
+                'texts_per_second': round(len(texts) / elapsed, 1) if elapsed else None,
+                'batches': after['batches'] - before['batches'],
+                'padded_tokens': after['padded_tokens'] - before['padded_tokens'],
+            }
+        report['tokens'] = after['tokens'] - before['tokens']
+        report['speedup'] = (
+            round(report['unsorted']['seconds'] / report['bucketed']['seconds'], 2)
+            if report['bucketed']['seconds'] else None
+        )
+
+        # Padding is masked, so both orders must score every text the same
+        report['max_abs_diff'] = round(max(
+            abs(dict(zip(a['labels'], a['scores']))[label] - dict(zip(b['labels'], b['scores']))[label])
+            for a, b in zip(outputs['unsorted'], outputs['bucketed'])
+            for label in labels
+        ), 6)
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,60 @@
+"""
+Build the feature normalization artifact from reference CSV data
+
+Usage:
+    python manage.py build_normalization media/medical_reports/15_disease_dataset_100_each.csv --artifact-version 1
+"""
+
+import csv
+import os
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.feature_extraction import FEATURE_SCHEMA, extract_features, feature_names
+from app.normalization import DEFAULT_NORMALIZATION_PATH, FeatureNormalizer
+
+
+class Command(BaseCommand):
+    help = 'Fit feature normalization statistics on reference CSV files and save them as a versioned artifact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_files', nargs='+', help='Reference CSV files with patient vitals')
+        parser.add_argument('--artifact-version', dest='artifact_version', required=True, help='Version label for the artifact')
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Output path (defaults to settings.FEATURE_NORMALIZATION_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        rows = []
+        for path in options['csv_files']:
+            if not os.path.exists(path):
+                raise CommandError(f'File not found: {path}')
+            with open(path, encoding='utf-8') as f:
+                rows.extend(csv.DictReader(f))
+
+        if not rows:
+            raise CommandError('Reference files contain no rows')
+
+        data = pd.DataFrame(rows)
+        data.columns = [col.lower().strip() for col in data.columns]
+        features = extract_features(data, FEATURE_SCHEMA)
+
+        normalizer = FeatureNormalizer.fit(
+            features,
+            options['artifact_version'],
+            feature_names=feature_names(FEATURE_SCHEMA),
+            source=f"{', '.join(os.path.basename(p) for p in options['csv_files'])} ({len(rows)} rows)",
+        )
+
+        output = options['output'] or getattr(settings, 'FEATURE_NORMALIZATION_PATH', DEFAULT_NORMALIZATION_PATH)
+        normalizer.save(output)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Normalization version {normalizer.version} written to {output} from {len(rows)} rows'
+        ))
+        for name, mean, scale in zip(normalizer.feature_names, normalizer.mean, normalizer.scale):
+            self.stdout.write(f'  - {name}: mean={mean:.4f} scale={scale:.4f}')
@@ -0,0 +1,68 @@
+"""
+Compare a quantized or exported NLP backend against fp32 scores
+
+Usage:
+    python manage.py check_nlp_precision patients.csv --precision int8 --limit 200
+"""
+
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.disease_predictor import MEDICAL_DISEASES, DiseasePredictor, nlp_backend_config
+from app.nlp_backends import PRECISIONS, compare_backends, create_backend
+
+
+class Command(BaseCommand):
+    help = 'Score clinical texts at fp32 and at another precision and report score parity, load time and memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='CSV file with patient vitals or clinical notes')
+        parser.add_argument(
+            '--precision',
+            choices=[precision for precision in PRECISIONS if precision != 'fp32'],
+            default='int8',
+            help='Precision compared against fp32',
+        )
+        parser.add_argument('--limit', type=int, default=100, help='Patients scored')
+
+    def handle(self, *args, **options):
+        path = options['csv_file']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = [row for _, row in zip(range(options['limit']), csv.DictReader(f))]
+
+        # Only builds clinical texts: 'deferred' never loads a third copy of the model
+        predictor = DiseasePredictor(model_loading='deferred')
+        frame = predictor._to_frame(rows)
+        texts = [text for text in (predictor._clinical_text(row) for _, row in frame.iterrows()) if text]
+        if not texts:
+            raise CommandError('No clinical texts could be built from the file')
+
+        backends = {}
+        try:
+            for precision in ('fp32', options['precision']):
+                name, model_id, backend_options = nlp_backend_config(precision)
+                backends[precision] = create_backend(name, model_id, MEDICAL_DISEASES, **backend_options)
+        except ImportError as e:
+            raise CommandError(f'NLP dependencies are not installed: {e}')
+
+        candidate = backends[options['precision']]
+        reference = backends['fp32']
+        report = {
+            'reference': reference.load_stats,
+            'candidate': candidate.load_stats,
+            'parity': compare_backends(
+                candidate,
+                reference,
+                texts,
+                MEDICAL_DISEASES,
+                batch_size=getattr(settings, 'HF_BATCH_SIZE', 16),
+            ),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
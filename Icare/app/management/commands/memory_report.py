@@ -0,0 +1,135 @@
+"""
+Shared vs private memory of a server's worker processes (Linux)
+
+Pages a worker still shares copy-on-write with its master count as shared;
+pages it wrote to or allocated itself count as private. PSS splits shared
+pages evenly between the processes mapping them, so the PSS total is the real
+footprint of the whole server.
+
+Usage:
+    python manage.py memory_report --pid <gunicorn master pid>
+    python manage.py memory_report --pid 4242 --pid 4243 --no-children --json
+"""
+
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap')
+
+
+def read_memory(pid):
+    """
+    Memory counters of one process in MB, from /proc/<pid>/smaps_rollup (or smaps on older kernels)
+
+    Returns:
+        Dict with rss, pss, shared, private and swap, or None if the process is gone
+    """
+    totals = dict.fromkeys(FIELDS, 0)
+    for name in ('smaps_rollup', 'smaps'):
+        try:
+            with open(f'/proc/{pid}/{name}') as f:
+                for line in f:
+                    key, _, rest = line.partition(':')
+                    if key in totals:
+                        totals[key] += int(rest.split()[0])
+            break
+        except FileNotFoundError:
+            if not os.path.exists(f'/proc/{pid}'):
+                return None
+    mb = {key: value / 1024 for key, value in totals.items()}
+    return {
+        'rss_mb': round(mb['Rss'], 1),
+        'pss_mb': round(mb['Pss'], 1),
+        'shared_mb': round(mb['Shared_Clean'] + mb['Shared_Dirty'], 1),
+        'private_mb': round(mb['Private_Clean'] + mb['Private_Dirty'], 1),
+        'swap_mb': round(mb['Swap'], 1),
+    }
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name is parenthesised and may contain spaces
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def process_name(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode(errors='replace').strip()[:60]
+    except OSError:
+        return '?'
+
+
+class Command(BaseCommand):
+    help = 'Report shared and private memory of a server master process and its forked workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pid', type=int, action='append', required=True, help='Master process id (repeatable)')
+        parser.add_argument('--no-children', action='store_true', help='Only report the given processes')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc/self'):
+            raise CommandError('memory_report needs the Linux /proc filesystem')
+
+        processes = []
+        for pid in options['pid']:
+            roles = [(pid, 'master')]
+            if not options['no_children']:
+                roles += [(child, 'worker') for child in child_pids(pid) if child != os.getpid()]
+            for process_id, role in roles:
+                try:
+                    memory = read_memory(process_id)
+                except PermissionError:
+                    raise CommandError(f'Not allowed to read /proc/{process_id} (run as the server user or root)')
+                if memory is None:
+                    if role == 'master':
+                        raise CommandError(f'No such process: {process_id}')
+                    continue
+                processes.append({'pid': process_id, 'role': role, 'command': process_name(process_id), **memory})
+
+        workers = [row for row in processes if row['role'] == 'worker']
+        summary = {
+            'processes': len(processes),
+            'workers': len(workers),
+            'total_pss_mb': round(sum(row['pss_mb'] for row in processes), 1),
+            'total_rss_mb': round(sum(row['rss_mb'] for row in processes), 1),
+        }
+        if workers:
+            summary['worker_private_mb'] = round(sum(row['private_mb'] for row in workers) / len(workers), 1)
+            summary['worker_shared_mb'] = round(sum(row['shared_mb'] for row in workers) / len(workers), 1)
+            summary['worker_shared_fraction'] = round(
+                sum(row['shared_mb'] for row in workers) / max(sum(row['rss_mb'] for row in workers), 1e-9), 3
+            )
+
+        if options['json']:
+            self.stdout.write(json.dumps({'processes': processes, 'summary': summary}, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'pid':>8} {'role':<7} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}  command"
+        )
+        for row in processes:
+            self.stdout.write(
+                f"{row['pid']:>8} {row['role']:<7} {row['rss_mb']:>9.1f} {row['pss_mb']:>9.1f} "
+                f"{row['shared_mb']:>10.1f} {row['private_mb']:>11.1f}  {row['command']}"
+            )
+        self.stdout.write(f"\nTotal PSS (real footprint): {summary['total_pss_mb']:.1f} MB "
+                          f"(RSS sum {summary['total_rss_mb']:.1f} MB)")
+        if workers:
+            self.stdout.write(
+                f"Per worker: {summary['worker_private_mb']:.1f} MB private, {summary['worker_shared_mb']:.1f} MB shared "
+                f"({summary['worker_shared_fraction']:.0%} of RSS)"
+            )
@@ -0,0 +1,49 @@
+"""
+List the NLP model registry, or download checkpoints into their local directories
+
+Run --download on a host with network access, then copy settings.HF_MODEL_DIR
+to air-gapped hosts.
+
+Usage:
+    python manage.py nlp_models
+    python manage.py nlp_models --download distilbart-mnli
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.model_registry import get_model_registry, selected_model_name
+
+
+class Command(BaseCommand):
+    help = 'List registered NLP models and whether a local checkpoint exists, or download one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--download', metavar='NAME', action='append', help='Model to download (repeatable)')
+
+    def handle(self, *args, **options):
+        registry = get_model_registry()
+
+        for name in options['download'] or []:
+            entry = registry.get(name)
+            if entry is None:
+                raise CommandError(f"Unknown NLP model '{name}' (registered: {', '.join(sorted(registry))})")
+            if not (entry.get('path') and entry.get('hub_id')):
+                raise CommandError(f"Model '{name}' needs both a path and a hub_id to be downloaded")
+            try:
+                from huggingface_hub import snapshot_download
+            except ImportError as e:
+                raise CommandError(f'huggingface_hub is not installed: {e}')
+            self.stdout.write(f"Downloading {entry['hub_id']} to {entry['path']}...")
+            snapshot_download(repo_id=entry['hub_id'], local_dir=str(entry['path']))
+            self.stdout.write(self.style.SUCCESS(f"✓ {name} saved to {entry['path']}"))
+
+        selected = selected_model_name()
+        self.stdout.write(f"{'':2}{'name':<20} {'backend':<10} {'local':<6} source")
+        for name, entry in sorted(registry.items()):
+            path = entry.get('path')
+            local = bool(path and os.path.isdir(path))
+            source = path if local else entry.get('hub_id') or path
+            marker = '* ' if name == selected else '  '
+            self.stdout.write(f"{marker}{name:<20} {entry['backend']:<10} {'yes' if local else 'no':<6} {source}")
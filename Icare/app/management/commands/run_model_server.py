@@ -0,0 +1,74 @@
+"""
+Run the shared model server for all Django workers
+
+Usage:
+    python manage.py run_model_server --socket /run/icare/model.sock
+
+Workers use it when settings.HF_MODEL_SERVER_SOCKET points at the same path.
+"""
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.model_server import ModelServer
+
+
+class Command(BaseCommand):
+    help = 'Load the NLP model once and serve batched scoring to Django workers over a Unix socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=None,
+            help='Socket path (defaults to settings.HF_MODEL_SERVER_SOCKET)',
+        )
+        parser.add_argument(
+            '--max-batch',
+            type=int,
+            default=None,
+            help='Texts merged into one model call (defaults to settings.HF_MODEL_SERVER_MAX_BATCH)',
+        )
+        parser.add_argument(
+            '--max-wait-ms',
+            type=float,
+            default=None,
+            help='Window for other requests to join a model call (defaults to settings.HF_MODEL_SERVER_MAX_WAIT_MS)',
+        )
+
+    def handle(self, *args, **options):
+        from app.disease_predictor import HuggingFaceMedicalPredictor
+
+        socket_path = options['socket'] or getattr(settings, 'HF_MODEL_SERVER_SOCKET', None)
+        if not socket_path:
+            raise CommandError('No socket path: pass --socket or set HF_MODEL_SERVER_SOCKET')
+        max_batch = options['max_batch'] or getattr(settings, 'HF_MODEL_SERVER_MAX_BATCH', 64)
+        max_wait_ms = options['max_wait_ms']
+        if max_wait_ms is None:
+            max_wait_ms = getattr(settings, 'HF_MODEL_SERVER_MAX_WAIT_MS', 10)
+
+        hf_predictor = HuggingFaceMedicalPredictor()
+        if not hf_predictor.models_loaded:
+            raise CommandError('The Hugging Face model could not be loaded; workers would gain nothing from this server')
+
+        try:
+            server = ModelServer(socket_path, hf_predictor, max_batch=max_batch, max_wait=max_wait_ms / 1000)
+        except (OSError, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        # shutdown() blocks until serve_forever() returns, so it cannot run in the serving thread
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Model server listening on {socket_path} '
+            f'({hf_predictor.backend_name}: {hf_predictor.model_id}, max batch {max_batch}, max wait {max_wait_ms} ms)'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write('Model server stopped')
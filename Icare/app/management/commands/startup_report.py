@@ -0,0 +1,166 @@
+"""
+Startup time and import cost of the project
+
+Each scenario runs in a fresh interpreter, so module caches from this process
+do not hide import costs.
+
+Usage:
+    python manage.py startup_report --runs 5
+    python manage.py startup_report --profile predictor --top 25
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules whose presence after a scenario shows the ML stack was imported
+HEAVY_MODULES = ('numpy', 'pandas', 'sklearn', 'torch', 'transformers', 'onnxruntime')
+
+SETUP = (
+    "import os, sys, time\n"
+    "start = time.perf_counter()\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})\n"
+    "import django\n"
+    "django.setup()\n"
+)
+
+SCENARIOS = {
+    'setup': "",
+    'urlconf': "import importlib; importlib.import_module({urlconf!r})\n",
+    'check': "from django.core.management import call_command; call_command('check', verbosity=0)\n",
+    'predictor': "import app.disease_predictor\n",
+    'predictor-ready': "from app.disease_predictor import get_disease_predictor; get_disease_predictor()\n",
+}
+
+REPORT = (
+    "import json\n"
+    "print(json.dumps({{'seconds': time.perf_counter() - start, "
+    "'loaded': [m for m in {heavy!r} if m in sys.modules]}}))\n"
+)
+
+
+def _script(scenario, report=True):
+    code = SETUP + SCENARIOS[scenario] + (REPORT if report else "")
+    return code.format(
+        settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', 'Icare.settings'),
+        urlconf=settings.ROOT_URLCONF,
+        heavy=HEAVY_MODULES,
+    )
+
+
+def _run(args):
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    )
+
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output
+
+    Returns:
+        List of (module, self microseconds, cumulative microseconds, depth)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+class Command(BaseCommand):
+    help = 'Benchmark startup scenarios in fresh interpreters and summarize -X importtime for one of them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Runs per scenario (the median is reported)')
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=list(SCENARIOS),
+            help='Scenario to benchmark (repeatable; default: all but predictor-ready)',
+        )
+        parser.add_argument(
+            '--profile',
+            choices=list(SCENARIOS),
+            default='urlconf',
+            help='Scenario whose imports are summarized',
+        )
+        parser.add_argument('--top', type=int, default=15, help='Modules and packages listed in the import summary')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or [name for name in SCENARIOS if name != 'predictor-ready']
+
+        benchmark = {}
+        for scenario in scenarios:
+            timings = []
+            loaded = []
+            for _ in range(max(options['runs'], 1)):
+                result = _run(['-c', _script(scenario)])
+                if result.returncode != 0:
+                    raise CommandError(f"Scenario '{scenario}' failed:\n{result.stderr[-2000:]}")
+                measured = json.loads(result.stdout.strip().splitlines()[-1])
+                timings.append(measured['seconds'])
+                loaded = measured['loaded']
+            benchmark[scenario] = {
+                'median_seconds': round(statistics.median(timings), 3),
+                'min_seconds': round(min(timings), 3),
+                'heavy_modules_loaded': loaded,
+            }
+
+        result = _run(['-X', 'importtime', '-c', _script(options['profile'], report=False)])
+        if result.returncode != 0:
+            raise CommandError(f"Import profile failed:\n{result.stderr[-2000:]}")
+        entries = parse_importtime(result.stderr)
+
+        packages = defaultdict(int)
+        for name, self_us, _, _ in entries:
+            packages[name.split('.')[0]] += self_us
+        top = options['top']
+        imports = {
+            'scenario': options['profile'],
+            'modules': len(entries),
+            'total_seconds': round(sum(entry[1] for entry in entries) / 1e6, 3),
+            'packages': [
+                {'package': name, 'seconds': round(us / 1e6, 3)}
+                for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+            ],
+            'modules_by_cumulative': [
+                {'module': name, 'self_seconds': round(self_us / 1e6, 3), 'cumulative_seconds': round(cumulative_us / 1e6, 3)}
+                for name, self_us, cumulative_us, depth in sorted(entries, key=lambda entry: -entry[2])[:top]
+            ],
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps({'startup': benchmark, 'imports': imports}, indent=2))
+            return
+
+        self.stdout.write(f"Startup (median of {options['runs']} run(s), fresh interpreter each):")
+        for scenario, row in benchmark.items():
+            heavy = ', '.join(row['heavy_modules_loaded']) or '-'
+            self.stdout.write(
+                f"  {scenario:<16} {row['median_seconds']:>7.3f}s  (min {row['min_seconds']:.3f}s)  heavy: {heavy}"
+            )
+
+        self.stdout.write(
+            f"\nImports for '{imports['scenario']}': {imports['modules']} modules, {imports['total_seconds']:.3f}s"
+        )
+        self.stdout.write("  By top-level package (self time):")
+        for row in imports['packages']:
+            self.stdout.write(f"    {row['package']:<32} {row['seconds']:>7.3f}s")
+        self.stdout.write("  Slowest imports (cumulative):")
+        for row in imports['modules_by_cumulative']:
+            self.stdout.write(f"    {row['module']:<48} {row['cumulative_seconds']:>7.3f}s")
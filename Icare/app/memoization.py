@@ -0,0 +1,157 @@
+"""
+Memoization of Repeated Vitals
+Uploads often repeat the same vitals (integer ages, glucose and cholesterol, a
+handful of blood pressures). Rows are deduplicated by their feature tuple so
+each distinct patient profile is scored once, and an optional bounded lookup
+table keeps scored profiles across uploads.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Resolution of each raw feature (age, gender, bp, cholesterol, glucose) as
+# "units per 1.0": 1 year, the three gender codes, 0.5 mmHg mean arterial
+# pressure, 1 mg/dL. Integer vitals snap onto this grid without any change.
+CLINICAL_GRID = np.array([100.0, 2.0, 400.0, 300.0, 200.0])
+
+
+def dedupe_rows(features, quantize=False):
+    """
+    Collapse identical feature rows
+
+    Args:
+        features: (N x F) raw feature matrix (before normalization)
+        quantize: Snap rows onto CLINICAL_GRID first, so near-identical
+                  fractional vitals share one profile
+
+    Returns:
+        (unique_features, keys, inverse): the U distinct rows, their lookup
+        keys, and for every input row the index of its unique row
+    """
+    features = np.asarray(features, dtype=float)
+    if quantize:
+        keys = np.round(features * CLINICAL_GRID)
+        features = keys / CLINICAL_GRID
+    else:
+        keys = features
+
+    _, first_index, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return features[first_index], keys[first_index], inverse.reshape(-1)
+
+
+class RiskLookupTable:
+    """
+    Bounded, process-wide table of scored profiles shared across uploads
+
+    Entries are keyed by (rule version, normalization version, feature key) so a
+    hot-reloaded rule catalog never serves stale risks. Oldest entries are
+    evicted first once max_entries is reached.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, namespace, keys):
+        """
+        Find stored risk rows for a batch of keys
+
+        Returns:
+            (found, rows): boolean mask over keys and the stored rows (None where missing)
+        """
+        found = np.zeros(len(keys), dtype=bool)
+        rows = [None] * len(keys)
+        with self._lock:
+            for idx, key in enumerate(keys):
+                entry = self._entries.get((namespace, key.tobytes()))
+                if entry is not None:
+                    found[idx] = True
+                    rows[idx] = entry
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found, rows
+
+    def store(self, namespace, keys, risks):
+        """Store freshly scored risk rows, evicting the oldest entries if full"""
+        with self._lock:
+            for key, row in zip(keys, risks):
+                self._entries[(namespace, key.tobytes())] = row
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def score_profiles(rule_engine, features, keys, namespace=None, table=None):
+    """
+    Score unique profiles, serving the ones already in the lookup table
+
+    Args:
+        rule_engine: RuleEngine to score with
+        features: (U x 5) normalized unique feature rows
+        keys: Lookup keys for the same rows (see dedupe_rows)
+        namespace: Table namespace identifying the rule and normalization versions
+        table: Optional RiskLookupTable
+
+    Returns:
+        (RuleScores, lookup_hits)
+    """
+    if table is None:
+        return rule_engine.evaluate(features), 0
+
+    found, rows = table.lookup(namespace, keys)
+    risks = np.empty((len(features), len(rule_engine.diseases)))
+    if found.any():
+        risks[found] = np.stack([rows[idx] for idx in np.flatnonzero(found)])
+
+    missing = ~found
+    if missing.any():
+        risks[missing] = rule_engine.score(features[missing])
+        table.store(namespace, keys[missing], risks[missing])
+
+    return rule_engine.evaluate_risks(risks), int(found.sum())
+
+
+_lookup_table = None
+_lookup_table_lock = threading.Lock()
+
+
+def get_risk_lookup_table():
+    """
+    Get the process-wide RiskLookupTable, or None when disabled
+
+    Sized by settings.PREDICTION_LUT_SIZE (0 disables the table).
+    """
+    global _lookup_table
+    if _lookup_table is None:
+        with _lookup_table_lock:
+            if _lookup_table is None:
+                try:
+                    from django.conf import settings
+                    size = int(getattr(settings, 'PREDICTION_LUT_SIZE', 0))
+                except Exception:
+                    size = 0
+                if size <= 0:
+                    return None
+                _lookup_table = RiskLookupTable(size)
+                logger.info(f"✓ Risk lookup table enabled ({size} profiles)")
+    return _lookup_table
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
 class ThemeMiddleware(MiddlewareMixin):
@@ -17,3 +18,17 @@ class ThemeMiddleware(MiddlewareMixin):
         if hasattr(request, 'theme'):
             response.set_cookie('theme', request.theme, max_age=31536000)  # 1 year
         return response
+
+
+class WarmupMiddleware(MiddlewareMixin):
+    """
+    Starts the predictor warmup (settings.HF_WARMUP) on the first request a
+    worker serves, so it always runs after any pre-fork and never in
+    management commands, test runs or scripts
+    """
+    
+    def process_request(self, request):
+        if getattr(settings, 'HF_WARMUP', False):
+            from .disease_predictor import start_warmup
+            start_warmup()
+        return None
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_analysisresult_follow_up_actions_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='rule_version',
+            field=models.CharField(blank=True, help_text='Disease rule catalog version used for scoring', max_length=50, null=True),
+        ),
+    ]
@@ -0,0 +1,192 @@
+"""
+Local NLP Model Registry
+settings.HF_MODELS maps logical model names to a backend and a checkpoint, and
+settings.HF_MODEL_NAME picks the one a deployment loads, so a host can trade
+accuracy for memory by switching to a distilled model without code changes.
+
+A checkpoint whose local directory exists is loaded with local_files_only, so
+air-gapped hosts never wait on hub lookups. Otherwise the hub id is used, from
+the local Hugging Face cache only when settings.HF_LOCAL_FILES_ONLY is on.
+
+Tests register a tiny randomly initialized checkpoint to run the Hugging Face
+code path offline:
+
+    register_tiny_model(tmp_dir)
+    with override_settings(HF_MODEL_NAME='tiny-random'):
+        ...
+"""
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'bart-large-mnli'
+
+# Used when settings.HF_MODELS is not set (hub ids only, no local directories)
+DEFAULT_MODELS = {
+    'bart-large-mnli': {'backend': 'zero-shot', 'hub_id': 'facebook/bart-large-mnli'},
+    'distilbart-mnli': {'backend': 'zero-shot', 'hub_id': 'valhalla/distilbart-mnli-12-3'},
+    'minilm-nli': {'backend': 'zero-shot', 'hub_id': 'cross-encoder/nli-MiniLM2-L6-H768'},
+    'minilm-embedding': {'backend': 'embedding', 'hub_id': 'sentence-transformers/all-MiniLM-L6-v2'},
+}
+
+# Entry keys that describe the checkpoint; any others are backend options (calibration, max_length, ...)
+ENTRY_KEYS = ('backend', 'hub_id', 'path')
+
+_registered = {}
+_registered_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    All known models: settings.HF_MODELS plus models registered at runtime
+
+    Returns:
+        Dict of logical name -> entry ({'backend', 'hub_id' and/or 'path', options})
+    """
+    from django.conf import settings
+
+    registry = dict(getattr(settings, 'HF_MODELS', DEFAULT_MODELS))
+    with _registered_lock:
+        registry.update(_registered)
+    return registry
+
+
+def selected_model_name():
+    from django.conf import settings
+
+    return getattr(settings, 'HF_MODEL_NAME', DEFAULT_MODEL_NAME)
+
+
+def register_model(name, backend, path=None, hub_id=None, **options):
+    """
+    Add (or replace) a registry entry for this process
+
+    Args:
+        name: Logical model name (what settings.HF_MODEL_NAME refers to)
+        backend: NLP backend name ('zero-shot' or 'embedding')
+        path: Local checkpoint directory
+        hub_id: Hugging Face hub id, used when path is missing
+        **options: Backend options (calibration, max_length, ...)
+
+    Raises:
+        ValueError: When neither path nor hub_id is given
+    """
+    if not (path or hub_id):
+        raise ValueError(f"Model '{name}' needs a local path or a hub id")
+    entry = {'backend': backend, **options}
+    if path:
+        entry['path'] = str(path)
+    if hub_id:
+        entry['hub_id'] = hub_id
+    with _registered_lock:
+        _registered[name] = entry
+
+
+def unregister_model(name):
+    with _registered_lock:
+        _registered.pop(name, None)
+
+
+def resolve_model(name=None):
+    """
+    Backend, checkpoint source and loading options of a registered model
+
+    Args:
+        name: Logical model name (defaults to settings.HF_MODEL_NAME)
+
+    Returns:
+        (backend name, local directory or hub id, backend options including local_files_only)
+
+    Raises:
+        ValueError: For an unknown name, or an entry with neither a usable path nor a hub id
+    """
+    from django.conf import settings
+
+    name = name or selected_model_name()
+    registry = get_model_registry()
+    try:
+        entry = registry[name]
+    except KeyError:
+        raise ValueError(f"Unknown NLP model '{name}' (registered: {', '.join(sorted(registry))})")
+
+    options = {key: value for key, value in entry.items() if key not in ENTRY_KEYS}
+    path = entry.get('path')
+    if path and os.path.isdir(path):
+        return entry['backend'], str(path), {**options, 'local_files_only': True}
+    if not entry.get('hub_id'):
+        raise ValueError(f"Checkpoint directory of NLP model '{name}' not found: {path}")
+    if path:
+        logger.warning(f"⚠️ No local checkpoint for '{name}' at {path}; loading {entry['hub_id']}")
+    local_files_only = getattr(settings, 'HF_LOCAL_FILES_ONLY', False)
+    return entry['backend'], entry['hub_id'], {**options, 'local_files_only': local_files_only}
+
+
+def create_tiny_model(directory, backend='zero-shot', seed=0):
+    """
+    Save a tiny randomly initialized BERT checkpoint (a few hundred KB, no download)
+
+    Scores are meaningless; it only exercises tokenization, batching and the
+    backends offline.
+
+    Args:
+        directory: Where the checkpoint is written
+        backend: 'zero-shot' (3-way NLI head) or 'embedding' (bare encoder)
+        seed: torch seed of the random weights
+
+    Returns:
+        The checkpoint directory
+    """
+    import string
+
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertModel, BertTokenizer
+
+    os.makedirs(directory, exist_ok=True)
+    # Single characters (plus their word-piece continuations) tokenize any text
+    characters = list(string.ascii_lowercase + string.digits)
+    vocab = (
+        ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+        + characters
+        + [f'##{character}' for character in characters]
+        + list(string.punctuation)
+    )
+    vocab_path = os.path.join(directory, 'vocab.txt')
+    with open(vocab_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocab) + '\n')
+    BertTokenizer(vocab_path, model_max_length=512).save_pretrained(directory)
+
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=512,
+    )
+    torch.manual_seed(seed)
+    if backend == 'zero-shot':
+        # The zero-shot pipeline finds the entailment logit by label name
+        config.num_labels = 3
+        config.id2label = {0: 'contradiction', 1: 'neutral', 2: 'entailment'}
+        config.label2id = {label: idx for idx, label in config.id2label.items()}
+        model = BertForSequenceClassification(config)
+    elif backend == 'embedding':
+        model = BertModel(config)
+    else:
+        raise ValueError(f"Unknown NLP backend '{backend}'")
+    model.save_pretrained(directory)
+    return directory
+
+
+def register_tiny_model(directory, name='tiny-random', backend='zero-shot', seed=0):
+    """
+    Create a tiny random checkpoint in directory and register it under name
+
+    Returns:
+        The registered name
+    """
+    register_model(name, backend, path=create_tiny_model(directory, backend=backend, seed=seed))
+    return name
@@ -0,0 +1,475 @@
+"""
+Shared Model Server
+One long-running process (`manage.py run_model_server`) holds the NLP model and
+scores clinical texts for every Django worker over a Unix socket, instead of
+each worker loading its own copy. Requests arriving from different workers
+within a short window are merged into batched model calls of at most
+max_batch texts, shared round-robin between the waiting requests.
+
+Messages are length-prefixed JSON: a 4-byte big-endian size, then the UTF-8
+body. Requests are {'op': 'predict', 'texts', 'candidates'}, {'op': 'ping'}
+(answered with the model's 'models_loaded' and 'status') or {'op': 'stats'};
+failures come back as {'error': message}.
+"""
+
+import collections
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('!I')
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+def _recv_exact(sock, size):
+    """Read exactly size bytes (None if the peer closed before sending anything)"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ConnectionError('connection closed mid-message')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """Next message from the socket, or None when the peer closed the connection"""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f'message of {length} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit')
+    body = _recv_exact(sock, length)
+    if body is None:
+        raise ConnectionError('connection closed mid-message')
+    return json.loads(body)
+
+
+class _Pending:
+    """One worker request, scored in max_batch slices that may span several model calls"""
+
+    __slots__ = ('texts', 'candidates', 'done', 'results', 'error', 'offset', 'scored', 'abandoned')
+
+    def __init__(self, texts, candidates):
+        self.texts = texts
+        self.candidates = candidates
+        self.done = threading.Event()
+        self.results = [None] * len(texts)
+        self.error = None
+        self.offset = 0  # next text to schedule
+        self.scored = 0
+        self.abandoned = False
+
+
+class MicroBatcher:
+    """
+    Merges concurrent scoring requests into shared model calls of at most max_batch texts
+
+    The first waiting request opens a window of max_wait seconds for others to
+    join. Each call then takes its texts round-robin from every waiting
+    request, so a large upload is scored across many calls and a small one
+    arriving meanwhile joins the next call instead of waiting for it.
+    """
+
+    def __init__(self, hf_predictor, max_batch=64, max_wait=0.01):
+        self.hf_predictor = hf_predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._closed = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='model-server-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts, candidates=None, timeout=None):
+        """
+        Score texts in the next batched calls
+
+        Returns:
+            One formatted prediction list (or None) per text
+
+        Raises:
+            TimeoutError: When the calls did not finish within timeout seconds
+            RuntimeError: When a model call failed
+        """
+        if self._closed:
+            raise RuntimeError('model server is shutting down')
+        if not texts:
+            return []
+        pending = _Pending(texts, candidates)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            # Its remaining slices are dropped instead of scored for nobody
+            pending.abandoned = True
+            raise TimeoutError('model call did not finish in time')
+        if pending.error:
+            raise RuntimeError(pending.error)
+        return pending.results
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+
+    def _run(self):
+        active = collections.deque()  # requests with texts left to schedule
+        while True:
+            if not active:
+                first = self._queue.get()
+                if first is None:
+                    self._fail(active)
+                    return
+                active.append(first)
+                waiting = len(first.texts)
+                deadline = time.monotonic() + self.max_wait
+                while waiting < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._queue.put(None)
+                        break
+                    active.append(item)
+                    waiting += len(item.texts)
+            else:
+                # Requests that arrived during the last call share the next one
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._fail(active)
+                        return
+                    active.append(item)
+            group = self._take(active)
+            if group:
+                self._score(group)
+
+    def _take(self, active):
+        """Slices of up to max_batch texts in total, taken round-robin from the active requests"""
+        group = []
+        budget = self.max_batch
+        while active and budget:
+            share = max(1, budget // len(active))
+            for _ in range(len(active)):
+                if not budget:
+                    break
+                pending = active.popleft()
+                if pending.abandoned or pending.done.is_set():
+                    continue
+                start = pending.offset
+                end = min(len(pending.texts), start + min(share, budget))
+                group.append((pending, start, end))
+                pending.offset = end
+                budget -= end - start
+                if end < len(pending.texts):
+                    # Back of the line: the next call starts with the other requests
+                    active.append(pending)
+        return group
+
+    def _fail(self, active):
+        """Fail whatever is still active or queued rather than leave callers waiting"""
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not None:
+                active.append(pending)
+        for pending in active:
+            pending.error = 'model server is shutting down'
+            pending.done.set()
+
+    def _score(self, group):
+        texts = [text for pending, start, end in group for text in pending.texts[start:end]]
+        candidates = None
+        if any(pending.candidates for pending, _, _ in group):
+            # Requests without candidates score every label
+            candidates = [
+                labels
+                for pending, start, end in group
+                for labels in (pending.candidates[start:end] if pending.candidates else [None] * (end - start))
+            ]
+        try:
+            results = self.hf_predictor.predict_batch_with_medical_nlp(texts, candidates=candidates)
+            position = 0
+            for pending, start, end in group:
+                pending.results[start:end] = results[position:position + end - start]
+                position += end - start
+        except Exception as e:
+            logger.error(f"Model server batch failed: {e}")
+            for pending, _, _ in group:
+                pending.error = str(e)
+        finally:
+            self.batches += 1
+            self.texts += len(texts)
+            for pending, start, end in group:
+                pending.scored += end - start
+                if (pending.error or pending.scored == len(pending.texts)) and not pending.done.is_set():
+                    self.requests += 1
+                    pending.done.set()
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'texts': self.texts,
+            'requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves one worker connection (many requests per connection)"""
+
+    def setup(self):
+        self.server.connections.add(self.request)
+
+    def finish(self):
+        self.server.connections.discard(self.request)
+
+    def handle(self):
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Model server dropped a connection: {e}")
+                return
+            if request is None:
+                return
+
+            op = request.get('op')
+            try:
+                if op == 'predict':
+                    response = {'results': self.server.batcher.submit(
+                        request['texts'], request.get('candidates'), timeout=self.server.request_timeout
+                    )}
+                elif op == 'ping':
+                    # A ping is demand from a worker: an evicted model starts reloading
+                    hf_predictor = self.server.hf_predictor
+                    models_loaded = hf_predictor.ensure_loaded()
+                    response = {'ok': True, 'models_loaded': models_loaded, 'status': hf_predictor.status()}
+                elif op == 'stats':
+                    response = self.server.stats()
+                else:
+                    response = {'error': f"unknown op '{op}'"}
+            except Exception as e:
+                response = {'error': str(e)}
+
+            try:
+                send_message(self.request, response)
+            except OSError:
+                return
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server around a loaded HuggingFaceMedicalPredictor
+
+    Args:
+        socket_path: Filesystem path of the socket
+        hf_predictor: Predictor with the model loaded
+        max_batch: Texts per merged model call
+        max_wait: Seconds the first request waits for others to join its call
+        request_timeout: Seconds a request may wait for its model call
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, hf_predictor, max_batch=64, max_wait=0.01, request_timeout=120.0):
+        if os.path.exists(socket_path):
+            if _server_alive(socket_path):
+                raise RuntimeError(f'A model server is already listening on {socket_path}')
+            # Left behind by a server that did not shut down cleanly
+            os.unlink(socket_path)
+
+        self.socket_path = socket_path
+        self.hf_predictor = hf_predictor
+        self.request_timeout = request_timeout
+        self.started = time.time()
+        self.connections = set()
+        self.batcher = MicroBatcher(hf_predictor, max_batch=max_batch, max_wait=max_wait)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def stats(self):
+        stats = self.hf_predictor.backend_stats()
+        stats['model_server'] = {
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'max_batch': self.batcher.max_batch,
+            'max_wait_ms': round(self.batcher.max_wait * 1000, 1),
+            **self.batcher.stats(),
+        }
+        return stats
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+        # Workers holding a connection see it close and fall back to rules
+        for conn in list(self.connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _server_alive(socket_path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(1.0)
+            conn.connect(socket_path)
+            send_message(conn, {'op': 'ping'})
+            return bool(recv_message(conn))
+    except (OSError, ValueError):
+        return False
+
+
+class RemoteMedicalPredictor:
+    """
+    Client for the model server, used in place of HuggingFaceMedicalPredictor
+
+    models_loaded is True only while the server answers and its model is
+    loaded, so otherwise DiseasePredictor keeps every patient on the in-process
+    rule engine. The server's state is checked at most once per retry_interval
+    seconds, and a failed call marks it unavailable for that long. Texts are
+    sent in slices of max_batch, so one worker's large upload interleaves with
+    the other workers' requests and each slice gets its own timeout.
+    """
+
+    def __init__(self, socket_path, timeout=30.0, retry_interval=5.0, max_batch=64):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.retry_interval = retry_interval
+        self._local = threading.local()
+        self._status = None
+        self._status_until = 0.0
+        # A connection inherited through fork() would interleave two workers' messages
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._forget_connections())
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    @property
+    def models_loaded(self):
+        return self.status() == 'ready'
+
+    def status(self):
+        """Status of the server's model ('ready', 'loading', 'evicted', ...), 'unavailable' if unreachable"""
+        if time.monotonic() < self._status_until:
+            return self._status
+        try:
+            response = self._call({'op': 'ping'})
+        except (OSError, RuntimeError, ValueError) as e:
+            self._mark_down(e)
+            return self._status
+        self._status = response.get('status', 'ready' if response.get('models_loaded') else 'disabled')
+        self._status_until = time.monotonic() + self.retry_interval
+        return self._status
+
+    def _mark_down(self, error):
+        if self._status != 'unavailable':
+            logger.warning(f"⚠️ Model server unavailable at {self.socket_path} ({error}); using rule-based prediction")
+        self._status = 'unavailable'
+        self._status_until = time.monotonic() + self.retry_interval
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _call(self, payload):
+        """Send one request on this thread's connection (reconnecting once if it went stale)"""
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None:
+                    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self._local.conn = conn
+                    conn.settimeout(self.timeout)
+                    conn.connect(self.socket_path)
+                send_message(conn, payload)
+                response = recv_message(conn)
+                if response is None:
+                    raise ConnectionError('model server closed the connection')
+                break
+            except TimeoutError:
+                self._drop_connection()
+                raise
+            except OSError:
+                self._drop_connection()
+                if attempt:
+                    raise
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    def predict_batch_with_medical_nlp(self, medical_texts, batch_size=None, candidates=None):
+        """
+        Score texts on the model server, max_batch texts per request (batch_size is decided by the server)
+
+        Returns:
+            List with one sorted prediction list per text (None where the
+            server could not score, so those rows keep rule predictions)
+        """
+        medical_texts = list(medical_texts)
+        results = [None] * len(medical_texts)
+        for start in range(0, len(medical_texts), self.max_batch):
+            end = start + self.max_batch
+            try:
+                response = self._call({
+                    'op': 'predict',
+                    'texts': medical_texts[start:end],
+                    'candidates': candidates[start:end] if candidates else None,
+                })
+            except (OSError, RuntimeError, ValueError) as e:
+                # The remaining slices keep their rule predictions too
+                self._mark_down(e)
+                break
+            results[start:end] = response['results']
+        return results
+
+    def ensure_loaded(self):
+        """The server manages its own model; here only reachability matters"""
+        return self.models_loaded
+
+    def predict_with_medical_nlp(self, medical_text):
+        return self.predict_batch_with_medical_nlp([medical_text])[0]
+
+    def backend_stats(self):
+        try:
+            return self._call({'op': 'stats'})
+        except (OSError, RuntimeError, ValueError) as e:
+            self._mark_down(e)
+            return {}
@@ -94,6 +94,7 @@ class AnalysisResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     analysis_duration = models.FloatField(default=0.0, help_text="Analysis time in seconds")
+    rule_version = models.CharField(max_length=50, blank=True, null=True, help_text="Disease rule catalog version used for scoring")
     
     class Meta:
         ordering = ['-created_at']
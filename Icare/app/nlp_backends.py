@@ -0,0 +1,491 @@
+"""
+Inference Backends for the Medical NLP Model
+Each backend turns a batch of clinical texts and candidate labels into
+{'labels', 'scores'} results (labels sorted by descending score, scores in
+[0, 1]), so HuggingFaceMedicalPredictor formats and risk-bands every backend
+the same way. torch and transformers are imported only when a backend loads.
+
+Every backend can run its CPU model at a different precision:
+    fp32 - weights as published
+    int8 - dynamic int8 quantization of the Linear layers
+    bf16 - bfloat16 weights, where the CPU supports bf16 (falls back to fp32)
+    onnx - ONNX Runtime export (requires optimum[onnxruntime])
+
+Texts are sorted by token length and grouped into buckets whose padded size
+stays within a token budget, so short generated summaries are never padded to
+the length of a long free-text note; results come back in input order.
+
+A backend can be shared by request threads: model calls are serialized per
+backend (fast tokenizers are not safe to call concurrently, and each forward
+pass already uses every intra-op thread).
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ('fp32', 'int8', 'bf16', 'onnx')
+
+
+def _rss_mb():
+    """Resident memory of this process in MB (0.0 where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _weights_mb(model):
+    """Size of a torch model's parameters and buffers in MB (None for non-torch models)"""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except AttributeError:
+        return None
+    return round(sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024), 1)
+
+
+def _parameter_count(model):
+    """Parameters of a torch model (None for non-torch models)"""
+    try:
+        return sum(p.numel() for p in model.parameters())
+    except AttributeError:
+        return None
+
+
+def bf16_supported():
+    """Whether this CPU has native bfloat16 kernels"""
+    try:
+        import torch
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+def apply_precision(model, precision):
+    """
+    Convert a loaded fp32 torch model to the requested CPU precision
+
+    Returns:
+        (model, effective_precision)
+    """
+    import torch
+
+    if precision == 'int8':
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8), 'int8'
+    if precision == 'bf16':
+        if bf16_supported():
+            return model.to(torch.bfloat16), 'bf16'
+        logger.warning("⚠️ CPU has no native bf16 support, keeping fp32 weights")
+    return model, 'fp32'
+
+
+def plan_batches(lengths, max_tokens=None, max_texts=None, sort=True):
+    """
+    Group texts into batches by token length
+
+    Args:
+        lengths: Token length of every text
+        max_tokens: Budget for a batch's padded size (longest text x texts), None for no budget
+        max_texts: Texts per batch, None for no limit
+        sort: Sort by length first (False keeps input order, i.e. plain fixed-size batching)
+
+    Returns:
+        List of batches, each a list of text indexes
+    """
+    order = np.argsort(lengths, kind='stable').tolist() if sort else range(len(lengths))
+    batches = []
+    current = []
+    longest = 0
+    for idx in order:
+        length = lengths[idx]
+        full = max_texts is not None and len(current) >= max_texts
+        over_budget = max_tokens is not None and max(longest, length) * (len(current) + 1) > max_tokens
+        if current and (full or over_budget):
+            batches.append(current)
+            current = []
+            longest = 0
+        current.append(idx)
+        longest = max(longest, length)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def padded_tokens(lengths, batches):
+    """Tokens processed when every batch is padded to its longest text"""
+    return sum(max(lengths[idx] for idx in batch) * len(batch) for batch in batches)
+
+
+class NLPBackend:
+    """
+    Shared loading for inference backends: precision handling, load time and memory
+
+    Attributes:
+        model_id: Hub id or local checkpoint directory
+        precision: Effective precision after loading
+        local_files_only: Never contact the hub (local directory or Hugging Face cache only)
+        load_stats: Backend, precision, load seconds, parameter count, resident memory and weight size
+    """
+
+    name = None
+    # Token limit for truncation (None uses the tokenizer's model_max_length)
+    max_length = None
+
+    def __init__(self, model_id, labels=None, precision='fp32', local_files_only=False):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}' (choose from {', '.join(PRECISIONS)})")
+
+        self.model_id = model_id
+        self.precision = precision
+        self.local_files_only = local_files_only
+        self.model = None
+        self.tokenizer = None
+        # Counted before quantization, which packs Linear weights outside parameters()
+        self.parameter_count = None
+        self._stats_lock = threading.Lock()
+        # Reentrant: classify_batches holds it across the classify calls it makes
+        self._model_lock = threading.RLock()
+        self._batching = {'texts': 0, 'batches': 0, 'tokens': 0, 'padded_tokens': 0, 'unsorted_padded_tokens': 0}
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        self._load(labels)
+        self.load_stats = {
+            'backend': self.name,
+            'model': model_id,
+            'precision': self.precision,
+            'local_files_only': local_files_only,
+            'load_seconds': round(time.perf_counter() - start, 2),
+            'parameters': self.parameter_count,
+            'rss_mb': round(_rss_mb(), 1),
+            'rss_delta_mb': round(_rss_mb() - rss_before, 1),
+            'weights_mb': _weights_mb(self.model),
+        }
+        parameters = f"{self.parameter_count / 1e6:.1f}M parameters, " if self.parameter_count else ''
+        logger.info(
+            f"✓ {self.name} backend loaded ({model_id}, {self.precision}) in "
+            f"{self.load_stats['load_seconds']}s, {parameters}+{self.load_stats['rss_delta_mb']} MB RSS"
+        )
+
+    def _load(self, labels):
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def _inference(self):
+        """Context for forward passes: holds the model lock, without autograd bookkeeping"""
+        try:
+            import torch
+            mode = torch.inference_mode()
+        except ImportError:
+            mode = contextlib.nullcontext()
+        with self._model_lock, mode:
+            yield
+
+    def classify(self, texts, labels, batch_size=16):
+        raise NotImplementedError
+
+    def sequences_per_text(self, labels):
+        """Model input sequences one text expands to"""
+        return 1
+
+    def token_lengths(self, texts):
+        """Token count of every text, after truncation"""
+        max_length = self.max_length or self.tokenizer.model_max_length
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=max_length)
+        return [len(ids) for ids in encoded['input_ids']]
+
+    def classify_batches(self, texts, labels, batch_size=16, max_tokens=None):
+        """
+        Classify texts in length-sorted buckets and return results in input order
+
+        Args:
+            texts: Clinical texts
+            labels: Candidate label descriptions
+            batch_size: Sequences per forward pass when max_tokens is None
+            max_tokens: Padded-token budget per forward pass; each bucket is one
+                        pass padded to its own longest text (None keeps
+                        fixed-size batches in input order)
+
+        Returns:
+            One {'labels', 'scores'} dict per text
+        """
+        if not texts:
+            return []
+
+        with self._model_lock:
+            return self._classify_batches(texts, labels, batch_size, max_tokens)
+
+    def _classify_batches(self, texts, labels, batch_size, max_tokens):
+        per_text = self.sequences_per_text(labels)
+        lengths = self.token_lengths(texts)
+        # Reference: batch_size sequences per pass in input order, padded to the longest in each
+        sequence_lengths = np.repeat(lengths, per_text).tolist()
+        unsorted = plan_batches(sequence_lengths, max_texts=batch_size, sort=False)
+        unsorted_padded = padded_tokens(sequence_lengths, unsorted)
+
+        if max_tokens:
+            batches = plan_batches(lengths, max_tokens=max(1, max_tokens // per_text))
+            results = [None] * len(texts)
+            for batch in batches:
+                outputs = self.classify([texts[idx] for idx in batch], labels, batch_size=len(batch) * per_text)
+                for idx, output in zip(batch, outputs):
+                    results[idx] = output
+            padded = padded_tokens(lengths, batches) * per_text
+        else:
+            results = self.classify(list(texts), labels, batch_size=batch_size)
+            batches = unsorted
+            padded = unsorted_padded
+
+        with self._stats_lock:
+            self._batching['texts'] += len(texts)
+            self._batching['batches'] += len(batches)
+            self._batching['tokens'] += sum(lengths) * per_text
+            self._batching['padded_tokens'] += padded
+            self._batching['unsorted_padded_tokens'] += unsorted_padded
+        return results
+
+    def batching_stats(self):
+        """Padding of the batches run so far, against fixed-size batches in input order"""
+        with self._stats_lock:
+            stats = dict(self._batching)
+        padded = stats['padded_tokens']
+        unsorted = stats['unsorted_padded_tokens']
+        stats['padding_ratio'] = round(1 - stats['tokens'] / padded, 4) if padded else 0.0
+        stats['unsorted_padding_ratio'] = round(1 - stats['tokens'] / unsorted, 4) if unsorted else 0.0
+        stats['padded_tokens_saved'] = unsorted - padded
+        return stats
+
+
+class ZeroShotBackend(NLPBackend):
+    """
+    Cross-encoder NLI zero-shot classification (transformers pipeline)
+
+    Every (text, label) pair is a full forward pass, so nothing can be
+    precomputed for the labels.
+    """
+
+    name = 'zero-shot'
+
+    def _load(self, labels):
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id, local_files_only=self.local_files_only)
+        if self.precision == 'onnx':
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            self.model = ORTModelForSequenceClassification.from_pretrained(
+                self.model_id, export=True, local_files_only=self.local_files_only
+            )
+        else:
+            model = AutoModelForSequenceClassification.from_pretrained(
+                self.model_id, local_files_only=self.local_files_only
+            ).eval()
+            self.parameter_count = _parameter_count(model)
+            self.model, self.precision = apply_precision(model, self.precision)
+
+        self.pipeline = pipeline(
+            "zero-shot-classification",
+            model=self.model,
+            tokenizer=self.tokenizer,
+            device=-1  # CPU by default, use GPU if available
+        )
+
+    def sequences_per_text(self, labels):
+        """One (text, label) pair per candidate label"""
+        return len(labels)
+
+    def classify(self, texts, labels, batch_size=16):
+        """
+        Args:
+            texts: Clinical texts
+            labels: Candidate label descriptions
+            batch_size: (text, label) pairs per forward pass
+
+        Returns:
+            One {'labels', 'scores'} dict per text
+        """
+        with self._inference():
+            outputs = self.pipeline(texts, labels, multi_class=True, batch_size=batch_size)
+        # A single input comes back as a dict rather than a list
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+        return [
+            {'labels': list(output['labels']), 'scores': [float(score) for score in output['scores']]}
+            for output in outputs
+        ]
+
+
+class EmbeddingBackend(NLPBackend):
+    """
+    Sentence-embedding similarity between clinical texts and label descriptions
+
+    Label descriptions are embedded once at load and kept as a unit-norm
+    matrix; a batch of texts then costs one encoder pass plus a
+    (texts x labels) matrix product. Cosine similarities are mapped to [0, 1]
+    with a logistic calibration, sigmoid(scale * (cosine - shift)), so the
+    zero-shot risk bands (0.4 / 0.7) keep their meaning.
+    """
+
+    name = 'embedding'
+
+    def __init__(self, model_id, labels, precision='fp32', calibration=(0.3, 10.0), max_length=256,
+                 local_files_only=False):
+        self.shift, self.scale = calibration
+        self.max_length = max_length
+        super().__init__(model_id, labels, precision, local_files_only)
+
+    def _load(self, labels):
+        from transformers import AutoModel, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id, local_files_only=self.local_files_only)
+        if self.precision == 'onnx':
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            self.model = ORTModelForFeatureExtraction.from_pretrained(
+                self.model_id, export=True, local_files_only=self.local_files_only
+            )
+        else:
+            model = AutoModel.from_pretrained(self.model_id, local_files_only=self.local_files_only).eval()
+            self.parameter_count = _parameter_count(model)
+            self.model, self.precision = apply_precision(model, self.precision)
+
+        self.labels = list(labels)
+        self.label_index = {label: idx for idx, label in enumerate(self.labels)}
+        self.label_embeddings = self.encode(self.labels)
+
+    def encode(self, texts, batch_size=32):
+        """
+        Mean-pooled, L2-normalized embeddings
+
+        Returns:
+            (len(texts) x hidden) float32 array
+        """
+        import torch
+
+        chunks = []
+        with self._inference():
+            for start in range(0, len(texts), batch_size):
+                encoded = self.tokenizer(
+                    list(texts[start:start + batch_size]),
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors='pt',
+                )
+                hidden = self.model(**encoded).last_hidden_state
+                mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                chunks.append(torch.nn.functional.normalize(pooled, dim=-1).float().numpy())
+
+        if not chunks:
+            return np.empty((0, self.model.config.hidden_size), dtype=np.float32)
+        return np.concatenate(chunks)
+
+    def _label_matrix(self, labels):
+        """Rows of the precomputed label matrix (labels outside it are embedded once and kept)"""
+        unknown = [label for label in labels if label not in self.label_index]
+        if unknown:
+            for label in unknown:
+                self.label_index[label] = len(self.labels)
+                self.labels.append(label)
+            self.label_embeddings = np.concatenate([self.label_embeddings, self.encode(unknown)])
+        return self.label_embeddings[[self.label_index[label] for label in labels]]
+
+    def classify(self, texts, labels, batch_size=16):
+        """
+        Args:
+            texts: Clinical texts
+            labels: Candidate label descriptions
+            batch_size: Texts per encoder pass
+
+        Returns:
+            One {'labels', 'scores'} dict per text
+        """
+        with self._model_lock:
+            similarity = self.encode(texts, batch_size) @ self._label_matrix(labels).T
+        scores = 1.0 / (1.0 + np.exp(-self.scale * (similarity - self.shift)))
+
+        results = []
+        for row in scores.astype(float):
+            ranked = np.argsort(-row, kind='stable')
+            results.append({'labels': [labels[idx] for idx in ranked], 'scores': row[ranked].tolist()})
+        return results
+
+
+BACKENDS = {
+    ZeroShotBackend.name: ZeroShotBackend,
+    EmbeddingBackend.name: EmbeddingBackend,
+}
+
+
+def create_backend(name, model_id, labels, **options):
+    """
+    Load an inference backend by name
+
+    Args:
+        name: Key of BACKENDS ('zero-shot' or 'embedding')
+        model_id: Hub id or local checkpoint directory
+        labels: Candidate label descriptions (precomputed where the backend allows)
+        **options: Backend keyword arguments (precision, local_files_only, calibration, ...)
+
+    Raises:
+        ValueError: For an unknown backend name or precision
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown NLP backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return backend_class(model_id, labels, **options)
+
+
+def _risk_band(score):
+    return 'High' if score > 0.7 else ('Medium' if score > 0.4 else 'Low')
+
+
+def compare_backends(candidate, reference, texts, labels, batch_size=16):
+    """
+    Parity of a candidate backend's scores against a reference (normally fp32)
+
+    Args:
+        candidate: Backend under test (e.g. int8 or onnx)
+        reference: Reference backend with the same model
+        texts: Clinical texts to score
+        labels: Candidate label descriptions
+
+    Returns:
+        Dict with max/mean absolute score difference, top-1 label agreement,
+        risk band agreement and the time each backend took
+    """
+    timings = {}
+    results = {}
+    for key, backend in (('candidate', candidate), ('reference', reference)):
+        start = time.perf_counter()
+        results[key] = backend.classify(texts, labels, batch_size=batch_size)
+        timings[key] = round(time.perf_counter() - start, 3)
+
+    differences = []
+    top1_matches = 0
+    band_matches = 0
+    for ours, theirs in zip(results['candidate'], results['reference']):
+        ours_scores = dict(zip(ours['labels'], ours['scores']))
+        theirs_scores = dict(zip(theirs['labels'], theirs['scores']))
+        top1_matches += ours['labels'][0] == theirs['labels'][0]
+        for label in labels:
+            differences.append(abs(ours_scores[label] - theirs_scores[label]))
+            band_matches += _risk_band(ours_scores[label]) == _risk_band(theirs_scores[label])
+
+    pairs = len(differences)
+    return {
+        'texts': len(texts),
+        'max_abs_diff': round(max(differences), 6) if differences else 0.0,
+        'mean_abs_diff': round(sum(differences) / pairs, 6) if pairs else 0.0,
+        'top1_agreement': round(top1_matches / len(texts), 4) if texts else 1.0,
+        'risk_band_agreement': round(band_matches / pairs, 4) if pairs else 1.0,
+        'candidate_seconds': timings['candidate'],
+        'reference_seconds': timings['reference'],
+    }
@@ -0,0 +1,131 @@
+"""
+Persisted Feature Normalization
+Standardizes feature matrices with a precomputed, versioned mean/scale artifact
+instead of fitting a scaler on whichever batch a worker happens to see first.
+Every process loads the same artifact once, so scoring is a pure function of
+the input row.
+"""
+
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Artifact shipped with the app (overridable via settings.FEATURE_NORMALIZATION_PATH)
+DEFAULT_NORMALIZATION_PATH = os.path.join(os.path.dirname(__file__), 'artifacts', 'feature_normalization.json')
+
+
+class FeatureNormalizer:
+    """
+    Read-only standardization: (features - mean) / scale
+
+    Matches StandardScaler.transform() semantics, with the statistics fixed at
+    build time (see the build_normalization management command).
+    """
+
+    def __init__(self, mean, scale, version, feature_names=None, source=None):
+        self.version = str(version)
+        self.feature_names = list(feature_names or [])
+        self.source = source
+        self.mean = np.array(mean, dtype=float)
+        self.scale = np.array(scale, dtype=float)
+        if self.mean.shape != self.scale.shape or self.mean.ndim != 1:
+            raise ValueError(f"Normalization {self.version}: mean and scale must be equal-length vectors")
+        # Shared between requests (and threads), so never mutated after load
+        self.mean.setflags(write=False)
+        self.scale.setflags(write=False)
+        self._pairs = tuple(zip(self.mean.tolist(), self.scale.tolist()))
+
+    @classmethod
+    def fit(cls, features, version, feature_names=None, source=None):
+        """
+        Compute normalization statistics from a reference feature matrix
+
+        Args:
+            features: (N x F) feature matrix
+            version: Version label stored in the artifact
+            feature_names: Optional column names, for documentation
+            source: Optional description of the reference data
+
+        Returns:
+            FeatureNormalizer instance
+        """
+        features = np.asarray(features, dtype=float)
+        if features.ndim != 2 or not len(features):
+            raise ValueError("Cannot fit normalization on an empty feature matrix")
+
+        mean = np.nanmean(features, axis=0)
+        scale = np.nanstd(features, axis=0)
+        # Constant columns are left unscaled, as StandardScaler does
+        scale[scale < 10 * np.finfo(float).eps] = 1.0
+        return cls(mean, scale, version, feature_names, source)
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a JSON normalization artifact"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['mean'], data['scale'], data['version'], data.get('features'), data.get('source'))
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'features': self.feature_names,
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+        }
+
+    def save(self, path):
+        """Write the artifact as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
+
+    def transform(self, features):
+        """
+        Standardize a feature matrix (returns a new array)
+
+        Args:
+            features: (N x F) or (F,) feature array
+
+        Returns:
+            Normalized float array of the same shape
+        """
+        normalized = np.array(features, dtype=float)
+        normalized -= self.mean
+        normalized /= self.scale
+        return normalized
+
+    def transform_record(self, features):
+        """Standardize one feature vector using plain floats"""
+        return [(value - mean) / scale for value, (mean, scale) in zip(features, self._pairs)]
+
+
+_normalizer = None
+_normalizer_lock = threading.Lock()
+
+
+def get_feature_normalizer():
+    """
+    Get the process-wide FeatureNormalizer, loading the artifact on first use
+
+    Returns:
+        FeatureNormalizer instance
+    """
+    global _normalizer
+    if _normalizer is None:
+        with _normalizer_lock:
+            if _normalizer is None:
+                try:
+                    from django.conf import settings
+                    path = getattr(settings, 'FEATURE_NORMALIZATION_PATH', DEFAULT_NORMALIZATION_PATH)
+                except Exception:
+                    path = DEFAULT_NORMALIZATION_PATH
+                _normalizer = FeatureNormalizer.from_file(path)
+                logger.info(f"✓ Feature normalization version {_normalizer.version} loaded from {path}")
+    return _normalizer
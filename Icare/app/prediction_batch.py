@@ -0,0 +1,226 @@
+"""
+Compact Prediction Results
+Struct-of-arrays container for batch predictions: per patient and disease an
+int16 confidence, an int8 risk code and the display ordering, plus a per-patient
+model code. Prediction dicts and rule contribution records are only built at
+the view/JSON boundary, and only for the rows that are actually shown.
+"""
+
+import numpy as np
+
+from .rule_engine import RISK_LEVELS
+
+# Model codes stored per patient
+MODELS = ('Rule-based', 'Hugging Face')
+RULE_MODEL = 0
+HF_MODEL = 1
+
+# Marks a disease a patient has no prediction for (risk code) and the end of a
+# patient's ordering (order); only possible for model rows with other labels
+MISSING = -1
+
+
+def row_ranges(rows):
+    """
+    Sorted row indexes as half-open [start, end) ranges, e.g. [0, 1, 2, 7] -> [[0, 3], [7, 8]]
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if not len(rows):
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = rows[np.concatenate(([0], breaks))]
+    ends = rows[np.concatenate((breaks - 1, [len(rows) - 1]))] + 1
+    return [[int(start), int(end)] for start, end in zip(starts, ends)]
+
+
+def extend_ranges(ranges, more):
+    """Append later [start, end) ranges, joining one that continues the last range"""
+    for start, end in more:
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+class PredictionBatch:
+    """
+    Predictions for N patients over D diseases, stored column-wise
+
+    Attributes:
+        diseases: Disease names, one per column (rule order first)
+        confidence: (N x D) int16 confidence percentages
+        risk_codes: (N x D) int8 indexes into RISK_LEVELS
+        order: (N x D) int16 per-patient column ordering, by descending confidence
+        model_codes: (N,) int8 indexes into MODELS
+        profile_index: (N,) unique rule profile of every patient
+    """
+
+    __slots__ = (
+        'rule_engine', 'diseases', 'confidence', 'risk_codes', 'order', 'model_codes',
+        'profile_index', 'profile_features', 'profile_risks', '_records', '_model_columns',
+    )
+
+    def __init__(self, rule_engine, scores, profile_features, profile_index=None):
+        """
+        Expand rule scores for unique profiles to every patient
+
+        Args:
+            rule_engine: RuleEngine the profiles were scored with
+            scores: RuleScores for the U unique profiles
+            profile_features: (U x 5) normalized profile features
+            profile_index: (N,) profile of every patient (defaults to one profile per patient)
+        """
+        if profile_index is None:
+            profile_index = np.arange(len(scores.risks))
+
+        self.rule_engine = rule_engine
+        self.diseases = list(rule_engine.diseases)
+        self.profile_index = profile_index
+        self.profile_features = profile_features
+        self.profile_risks = scores.risks
+        self.confidence = scores.confidence[profile_index]
+        self.risk_codes = scores.risk_codes[profile_index]
+        self.order = scores.order.astype(np.int16)[profile_index]
+        self.model_codes = np.full(len(profile_index), RULE_MODEL, dtype=np.int8)
+        self._records = {}
+        # Rows only partly scored by another model: row -> columns that model scored
+        self._model_columns = {}
+
+    def __len__(self):
+        return len(self.model_codes)
+
+    def _column(self, disease):
+        """Column of a disease, adding an empty column for labels outside the rule catalog"""
+        try:
+            return self.diseases.index(disease)
+        except ValueError:
+            self.diseases.append(disease)
+            self.confidence = np.pad(self.confidence, ((0, 0), (0, 1)))
+            self.risk_codes = np.pad(self.risk_codes, ((0, 0), (0, 1)), constant_values=MISSING)
+            self.order = np.pad(self.order, ((0, 0), (0, 1)), constant_values=MISSING)
+            return len(self.diseases) - 1
+
+    def set_predictions(self, idx, predictions, model_code=HF_MODEL):
+        """
+        Replace one patient's rule predictions with another model's
+
+        Args:
+            idx: Patient row
+            predictions: Sorted list of {disease, confidence, risk} dicts
+            model_code: Index into MODELS
+        """
+        columns = [self._column(pred['disease']) for pred in predictions]
+        self.confidence[idx] = 0
+        self.risk_codes[idx] = MISSING
+        self.order[idx] = MISSING
+        self.confidence[idx, columns] = [pred['confidence'] for pred in predictions]
+        self.risk_codes[idx, columns] = [RISK_LEVELS.index(pred['risk']) for pred in predictions]
+        self.order[idx, :len(columns)] = columns
+        self.model_codes[idx] = model_code
+        self._model_columns.pop(idx, None)
+
+    def merge_predictions(self, idx, predictions, model_code=HF_MODEL):
+        """
+        Overwrite only the diseases another model scored for one patient
+
+        The remaining diseases keep their rule predictions, and the row is
+        re-ranked by descending confidence (model predictions first on ties).
+
+        Args:
+            idx: Patient row
+            predictions: List of {disease, confidence, risk} dicts for a subset of diseases
+            model_code: Index into MODELS
+        """
+        columns = [self._column(pred['disease']) for pred in predictions]
+        self.confidence[idx, columns] = [pred['confidence'] for pred in predictions]
+        self.risk_codes[idx, columns] = [RISK_LEVELS.index(pred['risk']) for pred in predictions]
+
+        scored = set(columns)
+        merged = columns + [column for column in self.order[idx].tolist() if column != MISSING and column not in scored]
+        merged.sort(key=lambda column: -int(self.confidence[idx, column]))
+        self.order[idx] = MISSING
+        self.order[idx, :len(merged)] = merged
+        self.model_codes[idx] = model_code
+        self._model_columns[idx] = scored
+
+    def model_row_ranges(self, offset=0):
+        """
+        Rows scored by each model
+
+        Args:
+            offset: Upload index of this batch's first row
+
+        Returns:
+            Dict of model name -> [start, end) row ranges (models without rows omitted)
+        """
+        return {
+            MODELS[code]: row_ranges(np.flatnonzero(self.model_codes == code) + offset)
+            for code in np.unique(self.model_codes).tolist()
+        }
+
+    def _cell_model(self, idx, column, model_code):
+        """Model code of one prediction (rule-filled cells of partly scored rows stay rule-based)"""
+        model_columns = self._model_columns.get(idx)
+        if model_columns is not None and column not in model_columns:
+            return RULE_MODEL
+        return model_code
+
+    def contribution_record(self, idx, column):
+        """Rule contribution record for one patient and disease (built on first use)"""
+        key = (int(self.profile_index[idx]), column)
+        record = self._records.get(key)
+        if record is None:
+            profile = key[0]
+            record = self.rule_engine.contribution_record(
+                column, self.profile_features[profile], self.profile_risks[profile, column]
+            )
+            self._records[key] = record
+        return record
+
+    def prediction(self, idx, column):
+        """Prediction dict for one patient and disease"""
+        model_code = self._cell_model(idx, column, int(self.model_codes[idx]))
+        prediction = {
+            'disease': self.diseases[column],
+            'confidence': int(self.confidence[idx, column]),
+            'risk': RISK_LEVELS[self.risk_codes[idx, column]],
+            'model': MODELS[model_code],
+        }
+        if model_code == RULE_MODEL:
+            prediction['contributions'] = self.contribution_record(idx, column)
+        return prediction
+
+    def to_dicts(self):
+        """
+        Per-patient sorted prediction dicts (the predict_diseases() format)
+
+        Rule contribution records are built once per unique profile and shared
+        by patients with the same profile.
+        """
+        model_codes = self.model_codes.tolist()
+        profiles = self.profile_index.tolist()
+        records = None
+        if RULE_MODEL in model_codes or self._model_columns:
+            records = self.rule_engine.contribution_records(self.profile_features, self.profile_risks)
+
+        confidence = self.confidence.tolist()
+        risk_codes = self.risk_codes.tolist()
+        predictions = []
+        for idx, row_order in enumerate(self.order.tolist()):
+            row = []
+            for column in row_order:
+                if column == MISSING:
+                    break
+                model_code = self._cell_model(idx, column, model_codes[idx])
+                prediction = {
+                    'disease': self.diseases[column],
+                    'confidence': confidence[idx][column],
+                    'risk': RISK_LEVELS[risk_codes[idx][column]],
+                    'model': MODELS[model_code],
+                }
+                if model_code == RULE_MODEL:
+                    prediction['contributions'] = records[profiles[idx]][column]
+                row.append(prediction)
+            predictions.append(row)
+        return predictions
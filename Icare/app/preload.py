@@ -0,0 +1,57 @@
+"""
+Pre-Fork Preload
+With settings.PREDICTION_PRELOAD, the WSGI/ASGI entry points build the
+predictor, rule tables, precaution index and (with PREDICTION_PRELOAD_MODEL)
+the NLP weights in the server's master process. Workers forked from it share
+those pages copy-on-write instead of each building a private copy after the
+fork, and start serving without a cold start.
+
+This only helps servers that import the application before forking, e.g.
+`gunicorn --preload` or uWSGI without lazy-apps. `manage.py memory_report`
+shows the shared and private memory of each worker.
+"""
+
+import gc
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def preload():
+    """
+    Preload the prediction stack when settings.PREDICTION_PRELOAD is on
+
+    Returns:
+        Seconds spent preloading, or None when preloading is disabled
+    """
+    from django.conf import settings
+
+    if not getattr(settings, 'PREDICTION_PRELOAD', False):
+        return None
+
+    from .disease_precautions import get_precautions_for_predictions
+    from .disease_predictor import preload_predictor
+    from .model_server import RemoteMedicalPredictor
+
+    start = time.perf_counter()
+    load_model = getattr(settings, 'PREDICTION_PRELOAD_MODEL', False)
+    predictor = preload_predictor(load_model=load_model)
+    get_precautions_for_predictions(predictor.warm_rule_path().to_dicts()[0])
+
+    # Objects that exist now live for the whole process: freezing them keeps the
+    # collector from writing to (and so un-sharing) their pages in every worker
+    gc.collect()
+    gc.freeze()
+
+    seconds = round(time.perf_counter() - start, 2)
+    hf_predictor = predictor.hf_predictor
+    if hf_predictor is None:
+        model = 'disabled'
+    elif isinstance(hf_predictor, RemoteMedicalPredictor):
+        # Not pinged here: a connection opened before the fork would be shared by the workers
+        model = 'model server'
+    else:
+        model = hf_predictor.status()
+    logger.info(f"✓ Prediction stack preloaded before fork in {seconds}s (NLP model: {model})")
+    return seconds
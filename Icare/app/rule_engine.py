@@ -0,0 +1,507 @@
+"""
+Vectorized Rule-Based Scoring Engine
+Scores a whole (N x 5) feature matrix against all disease rules in a few
+array operations instead of building per-patient dicts in a Python loop.
+
+The rules themselves live in a versioned JSON catalog (rules/disease_rules.json):
+per disease the ordered (feature, weight) terms, intercept, and factor
+descriptions, plus the shared nonlinear derived features, risk thresholds and
+confidence floor. Each catalog is compiled once; get_rule_engine() swaps to a
+new version when the file changes, without restarting the worker.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column order of the feature matrix produced by DiseasePredictor
+FEATURE_NAMES = ('age', 'gender', 'bp', 'cholesterol', 'glucose')
+
+# Risk level names indexed by risk code
+RISK_LEVELS = ('Low', 'Medium', 'High')
+
+# Versioned rule catalog shipped with the app (overridable via settings.DISEASE_RULES_PATH)
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), 'rules', 'disease_rules.json')
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+
+def risk_level(risk_score, thresholds=(0.45, 0.75)):
+    """Risk level name for a single risk score"""
+    low, high = thresholds
+    return 'High' if risk_score > high else ('Medium' if risk_score > low else 'Low')
+
+
+# Scores for a batch: risks/confidence/risk_codes are (N x D), order is (N x k)
+RuleScores = namedtuple('RuleScores', ['risks', 'confidence', 'risk_codes', 'order'])
+
+
+def _abs_deviation(column, spec):
+    return np.abs(column - spec['center'])
+
+
+def _inverted_abs_deviation(column, spec):
+    return 1 - np.abs(column - spec['center'])
+
+
+def _floored_decline(column, spec):
+    # fmax keeps Python's max(floor, nan) == floor semantics
+    return np.fmax(spec['floor'], spec['base'] - column * spec['slope'])
+
+
+DERIVED_OPS = {
+    'abs_deviation': _abs_deviation,
+    'inverted_abs_deviation': _inverted_abs_deviation,
+    'floored_decline': _floored_decline,
+}
+
+# Plain-float versions of DERIVED_OPS for single-record scoring
+SCALAR_DERIVED_OPS = {
+    'abs_deviation': lambda value, spec: abs(value - spec['center']),
+    'inverted_abs_deviation': lambda value, spec: 1 - abs(value - spec['center']),
+    'floored_decline': lambda value, spec: max(spec['floor'], spec['base'] - value * spec['slope']),
+}
+
+
+class RuleEngine:
+    """
+    Compiled, vectorized evaluator for a disease rule catalog
+
+    The rules are compiled once into per-slot column/weight arrays: slot k holds
+    the k-th term of every disease, so scoring N patients is a handful of
+    (N x D) gathers, multiplies and adds regardless of N. Terms are accumulated
+    in catalog order, so results are bit-identical to evaluating each formula
+    by hand.
+    """
+
+    def __init__(self, catalog):
+        """
+        Compile a rule catalog into index and weight arrays
+
+        Args:
+            catalog: Dict with version, thresholds, confidence_floor,
+                     derived_features and diseases (see rules/disease_rules.json)
+
+        Raises:
+            ValueError: If the catalog references unknown features or ops
+        """
+        self.version = str(catalog['version'])
+        # Content hash: tells apart two edits of the file that kept the same version label
+        self.fingerprint = hashlib.sha1(json.dumps(catalog, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self.thresholds = tuple(float(t) for t in catalog.get('thresholds', (0.45, 0.75)))
+        self.confidence_floor = int(catalog.get('confidence_floor', 8))
+        self.rules = list(catalog['diseases'])
+        self.derived_features = list(catalog.get('derived_features', []))
+        self.diseases = tuple(rule['disease'] for rule in self.rules)
+        self.disease_index = {name: idx for idx, name in enumerate(self.diseases)}
+
+        if len(self.thresholds) != 2 or not self.rules:
+            raise ValueError(f"Rule catalog {self.version} needs two thresholds and at least one disease")
+
+        # Augmented matrix layout: base features, derived features, constant zero
+        self.column_names = FEATURE_NAMES + tuple(d['name'] for d in self.derived_features)
+        column_index = {name: idx for idx, name in enumerate(self.column_names)}
+        self._zero_column = len(self.column_names)
+        try:
+            self._derived = [
+                (DERIVED_OPS[d['op']], column_index[d['feature']], d)
+                for d in self.derived_features
+            ]
+        except KeyError as e:
+            raise ValueError(f"Rule catalog {self.version}: unknown derived feature op or input {e}")
+
+        num_slots = max(len(rule['terms']) for rule in self.rules)
+        num_diseases = len(self.rules)
+        self._term_columns = np.full((num_slots, num_diseases), self._zero_column, dtype=np.intp)
+        self._term_weights = np.zeros((num_slots, num_diseases))
+        for d, rule in enumerate(self.rules):
+            for slot, (feature, weight) in enumerate(rule['terms']):
+                if feature not in column_index:
+                    raise ValueError(f"Rule catalog {self.version}: {rule['disease']} uses unknown feature '{feature}'")
+                self._term_columns[slot, d] = column_index[feature]
+                self._term_weights[slot, d] = weight
+        self._intercepts = np.array([rule.get('intercept', 0.0) for rule in self.rules], dtype=float)
+        self._num_terms = [len(rule['terms']) for rule in self.rules]
+
+        # Same rules as plain tuples for the single-record path
+        self._scalar_derived = tuple(
+            (SCALAR_DERIVED_OPS[d['op']], column_index[d['feature']], d)
+            for d in self.derived_features
+        )
+        self._scalar_rules = tuple(
+            (
+                tuple((column_index[feature], float(weight)) for feature, weight in rule['terms']),
+                float(rule.get('intercept', 0.0)),
+            )
+            for rule in self.rules
+        )
+
+        # Reasoning templates, resolved once per disease and rendered on demand
+        self._reasoning_templates = [
+            (
+                f"{rule['disease']} Risk Assessment:\n",
+                tuple(
+                    (factor['label'], factor['description'], factor.get('below'))
+                    for factor in rule.get('factors', [])
+                ),
+            )
+            for rule in self.rules
+        ]
+
+    @classmethod
+    def from_file(cls, path):
+        """Load and compile a JSON rule catalog"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _augment(self, features):
+        """Append derived columns and a zero padding column to the feature matrix"""
+        augmented = np.empty((features.shape[0], self._zero_column + 1))
+        augmented[:, :features.shape[1]] = features
+        for offset, (op, source, spec) in enumerate(self._derived):
+            augmented[:, len(FEATURE_NAMES) + offset] = op(features[:, source], spec)
+        augmented[:, self._zero_column] = 0.0
+        return augmented
+
+    def score(self, features):
+        """
+        Compute clamped risk scores for every patient and disease
+
+        Args:
+            features: (N x 5) normalized feature matrix (a single vector is accepted)
+
+        Returns:
+            (N x D) float array of risks, columns ordered as self.diseases
+        """
+        features = np.asarray(features, dtype=float)
+        if features.ndim == 1:
+            features = features[np.newaxis, :]
+
+        augmented = self._augment(features)
+        risks = augmented[:, self._term_columns[0]] * self._term_weights[0]
+        for columns, weights in zip(self._term_columns[1:], self._term_weights[1:]):
+            risks += augmented[:, columns] * weights
+        risks += self._intercepts
+
+        # fmin keeps Python's min(1.0, nan) == 1.0 semantics
+        return np.fmin(risks, 1.0)
+
+    def band(self, risks):
+        """Risk level codes (0=Low, 1=Medium, 2=High) for a risk array"""
+        return np.digitize(risks, self.thresholds, right=True).astype(np.int8)
+
+    def confidence(self, risks):
+        """Integer confidence percentages with the catalog's confidence floor applied"""
+        return np.maximum(self.confidence_floor, np.trunc(risks * 100)).astype(np.int16)
+
+    def score_record(self, features):
+        """
+        Score one normalized feature vector with plain Python floats
+
+        Avoids numpy dispatch overhead for interactive single-patient requests;
+        results are identical to score() for the same row.
+
+        Args:
+            features: Sequence of 5 normalized features
+
+        Returns:
+            List of risks, ordered as self.diseases
+        """
+        values = list(features)
+        values.extend(op(values[source], spec) for op, source, spec in self._scalar_derived)
+
+        risks = []
+        for terms, intercept in self._scalar_rules:
+            column, weight = terms[0]
+            risk = values[column] * weight
+            for column, weight in terms[1:]:
+                risk += values[column] * weight
+            risks.append(min(risk + intercept, 1.0))
+        return risks
+
+    def confidence_value(self, risk_score):
+        """Integer confidence percentage for a single risk score"""
+        return max(self.confidence_floor, int(risk_score * 100))
+
+    @staticmethod
+    def rank(confidence, top_k=None):
+        """
+        Per-row disease ordering by descending confidence
+
+        Ties keep rule order (stable sort), matching sorted(..., reverse=True).
+        """
+        order = np.argsort(-confidence.astype(np.int32), axis=1, kind='stable')
+        return order[:, :top_k] if top_k else order
+
+    def evaluate(self, features, top_k=None):
+        """Score, band and rank a feature matrix in one call"""
+        return self.evaluate_risks(self.score(features), top_k)
+
+    def evaluate_risks(self, risks, top_k=None):
+        """Band and rank an already scored (N x D) risk array (e.g. from a lookup table)"""
+        confidence = self.confidence(risks)
+        return RuleScores(risks, confidence, self.band(risks), self.rank(confidence, top_k))
+
+    def term_contributions(self, features):
+        """
+        Weight x feature value products for every rule term
+
+        Args:
+            features: (N x 5) normalized feature matrix
+
+        Returns:
+            (N x S x D) float array; slot s of disease d holds its s-th term
+            (padding slots beyond a rule's own terms are zero)
+        """
+        features = np.asarray(features, dtype=float)
+        if features.ndim == 1:
+            features = features[np.newaxis, :]
+        return self._augment(features)[:, self._term_columns] * self._term_weights
+
+    def contribution_records(self, features, risks):
+        """
+        Compact per-patient, per-disease contribution records
+
+        Args:
+            features: (N x 5) normalized feature matrix
+            risks: (N x D) risks for the same matrix (see score())
+
+        Returns:
+            List (per patient) of lists (per disease, rule order) of dicts with
+            the disease id, risk, features and term contributions
+        """
+        features_list = np.asarray(features, dtype=float).reshape(len(risks), -1).tolist()
+        terms_list = self.term_contributions(features).transpose(0, 2, 1).tolist()
+        risks_list = np.asarray(risks).tolist()
+
+        return [
+            [
+                {
+                    'id': d,
+                    'risk': risks_list[idx][d],
+                    'features': features_list[idx],
+                    'terms': terms_list[idx][d][:num_terms],
+                }
+                for d, num_terms in enumerate(self._num_terms)
+            ]
+            for idx in range(len(risks_list))
+        ]
+
+    def contribution_record(self, disease_idx, feature_vector, risk):
+        """Contribution record for one patient and disease (same layout as contribution_records())"""
+        features = np.asarray(feature_vector, dtype=float).reshape(1, -1)
+        terms = self.term_contributions(features)[0, :self._num_terms[disease_idx], disease_idx]
+        return {
+            'id': disease_idx,
+            'risk': float(risk),
+            'features': features[0].tolist(),
+            'terms': terms.tolist(),
+        }
+
+    def contributing_factors(self, disease_idx, feature_vector):
+        """
+        Human-readable contributing factors for one disease and patient
+
+        Args:
+            disease_idx: Column index of the disease in self.diseases
+            feature_vector: Normalized features [age, gender, bp, cholesterol, glucose]
+
+        Returns:
+            Dict mapping factor label to its description
+        """
+        age, gender, bp, cholesterol, glucose = feature_vector
+        clinical = {
+            'age': int(age * 100),
+            'bp': int(bp * 200),
+            'cholesterol': int(cholesterol * 300),
+            'glucose': int(glucose * 200),
+        }
+
+        factors = {}
+        for label, description, below in self._reasoning_templates[disease_idx][1]:
+            if below and clinical[below['feature']] <= below['threshold']:
+                description = below['description']
+            factors[label.format(**clinical)] = description
+        return factors
+
+    def render_reasoning(self, record, disease=None):
+        """
+        Render the clinical reasoning text for a contribution record
+
+        Args:
+            record: Dict produced by contribution_records()
+            disease: Disease name of the record; looked up by name when given,
+                     since positional ids shift when the catalog is edited
+
+        Returns:
+            String explanation of why the disease was predicted
+        """
+        disease_idx = self.disease_index[disease] if disease else record['id']
+        risk_score = record['risk']
+        age, gender = record['features'][:2]
+
+        gender_str = "Male" if gender > 0.7 else ("Female" if gender < 0.3 else "Other")
+        reasoning = self._reasoning_templates[disease_idx][0]
+        reasoning += f"Risk Score: {int(risk_score * 100)}% | "
+        reasoning += f"Risk Level: {risk_level(risk_score, self.thresholds)}\n"
+        reasoning += f"Patient Profile: {int(age * 100)} years old, {gender_str}\n\n"
+        reasoning += "Contributing Factors:\n"
+
+        for factor, contribution in self.contributing_factors(disease_idx, record['features']).items():
+            reasoning += f"• {factor}: {contribution}\n"
+
+        return reasoning
+
+
+def _rules_setting(name, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+class RuleCatalog:
+    """
+    Hot-reloadable holder for the active RuleEngine
+
+    The catalog file is re-checked at most every reload_interval seconds. A new
+    version is compiled off to the side and swapped in with a single reference
+    assignment, so in-flight requests keep the engine they started with. A
+    catalog that fails to compile is logged and the previous engine stays active.
+    """
+
+    def __init__(self, path, reload_interval=DEFAULT_RELOAD_INTERVAL):
+        self.path = str(path)
+        self.reload_interval = reload_interval
+        self._engine = None
+        self._engines_by_version = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, mtime):
+        try:
+            engine = RuleEngine.from_file(self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if self._engine is None:
+                raise
+            logger.error(f"❌ Failed to load disease rules from {self.path}: {e}. Keeping version {self._engine.version}")
+            self._mtime = mtime
+            return
+
+        previous = self._engine.version if self._engine else None
+        self._engines_by_version[engine.version] = engine
+        self._engine = engine
+        self._mtime = mtime
+        if previous is None:
+            logger.info(f"✓ Disease rules version {engine.version} loaded ({len(engine.diseases)} diseases)")
+        else:
+            logger.info(f"🔄 Disease rules reloaded: version {previous} → {engine.version}")
+
+    def get(self):
+        """Current engine, reloading first if the catalog file changed"""
+        now = time.monotonic()
+        if self._engine is not None and now - self._checked_at < self.reload_interval:
+            return self._engine
+
+        with self._lock:
+            if self._engine is None or now - self._checked_at >= self.reload_interval:
+                self._checked_at = now
+                try:
+                    mtime = os.stat(self.path).st_mtime_ns
+                except OSError as e:
+                    if self._engine is None:
+                        raise
+                    logger.warning(f"⚠️ Cannot stat disease rules {self.path}: {e}")
+                    mtime = self._mtime
+                if mtime != self._mtime:
+                    self._load(mtime)
+        return self._engine
+
+    def get_version(self, version):
+        """Engine for a rule version loaded by this process (None if it is not known here)"""
+        self.get()
+        return self._engines_by_version.get(str(version))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_rule_catalog():
+    """
+    Get or create the process-wide RuleCatalog
+
+    Returns:
+        RuleCatalog for settings.DISEASE_RULES_PATH
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = RuleCatalog(
+                    _rules_setting('DISEASE_RULES_PATH', DEFAULT_RULES_PATH),
+                    _rules_setting('DISEASE_RULES_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL),
+                )
+    return _catalog
+
+
+def get_rule_engine(version=None):
+    """
+    Get the active RuleEngine (hot-reloaded when the catalog changes)
+
+    Args:
+        version: Optional rule version to look up instead of the current one
+
+    Returns:
+        RuleEngine instance (None for a version this process has not loaded)
+    """
+    catalog = get_rule_catalog()
+    return catalog.get_version(version) if version else catalog.get()
+
+
+_unrenderable_warned = set()
+
+
+def render_reasoning(prediction, rule_version=None):
+    """
+    Reasoning text for a prediction dict, rendered from its contribution record
+
+    Saved analyses carry the text directly (rendered when they were saved).
+    Records scored under a rule version this process has not loaded (or for a
+    disease the catalog dropped) get no reasoning rather than another catalog's.
+    """
+    if prediction.get('reasoning'):
+        return prediction['reasoning']
+
+    record = prediction.get('contributions')
+    if not record:
+        return None
+
+    engine = get_rule_engine(rule_version)
+    disease = prediction.get('disease')
+    if engine is None or (disease and disease not in engine.disease_index):
+        key = (rule_version, disease if engine else None)
+        if key not in _unrenderable_warned:
+            _unrenderable_warned.add(key)
+            reason = f"rule version {rule_version} is not loaded" if engine is None else f"no rule for {disease}"
+            logger.warning(f"⚠️ Skipping reasoning: {reason} (current version {get_rule_engine().version})")
+        return None
+    return engine.render_reasoning(record, disease)
+
+
+def attach_reasoning(predictions, rule_version=None):
+    """Fill in 'reasoning' on each prediction that has a contribution record"""
+    for prediction in predictions:
+        reasoning = render_reasoning(prediction, rule_version)
+        if reasoning:
+            prediction['reasoning'] = reasoning
+    return predictions
@@ -1,3 +1,509 @@
-from django.test import TestCase
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from app import disease_predictor, rule_engine
+from app.aggregation import RiskAggregate
+from app.disease_predictor import MEDICAL_DISEASES, DiseasePredictor, nlp_backend_config
+from app.memoization import RiskLookupTable
+from app.model_registry import register_model, register_tiny_model, unregister_model
+from app.model_server import MicroBatcher, ModelServer, RemoteMedicalPredictor
+from app.nlp_backends import EmbeddingBackend, ZeroShotBackend, create_backend
+
+NLP_STACK_INSTALLED = all(importlib.util.find_spec(name) for name in ('torch', 'transformers'))
+
+PATIENT = {'age': 62, 'gender': 'Male', 'blood_pressure': '150/95', 'cholesterol': 240, 'glucose': 180}
+
+# 60 rows over 23 distinct vitals profiles, so uploads repeat patients
+PATIENTS = [
+    {
+        'age': 25 + (i * 7) % 60,
+        'gender': 'Male' if i % 3 else 'Female',
+        'blood_pressure': f'{110 + (i * 5) % 60}/{70 + (i * 3) % 30}',
+        'cholesterol': 150 + (i * 11) % 150,
+        'glucose': 80 + (i * 13) % 140,
+    }
+    for i in (j % 23 for j in range(60))
+]
+
+
+def rules_only_predictor(**settings):
+    with override_settings(HF_MODEL_SERVER_SOCKET=None, **settings):
+        predictor = DiseasePredictor(model_loading='deferred')
+    predictor.hf_predictor = None
+    return predictor
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """Registry selection and checkpoint resolution (no NLP dependencies needed)"""
+
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.checkpoint_dir, ignore_errors=True)
+
+    def tearDown(self):
+        for name in ('local-model', 'hub-model', 'embedding-model'):
+            unregister_model(name)
+
+    def test_local_checkpoint_is_loaded_with_local_files_only(self):
+        register_model('local-model', 'zero-shot', path=self.checkpoint_dir, hub_id='org/model')
+        with override_settings(HF_MODEL_NAME='local-model', HF_PRECISION='int8'):
+            backend_name, model_id, options = nlp_backend_config()
+        self.assertEqual(backend_name, 'zero-shot')
+        self.assertEqual(model_id, self.checkpoint_dir)
+        self.assertEqual(options, {'local_files_only': True, 'precision': 'int8'})
+
+    def test_missing_directory_falls_back_to_hub_id(self):
+        missing = os.path.join(self.checkpoint_dir, 'missing')
+        register_model('hub-model', 'zero-shot', path=missing, hub_id='org/model')
+        with override_settings(HF_MODEL_NAME='hub-model', HF_LOCAL_FILES_ONLY=True):
+            _, model_id, options = nlp_backend_config()
+        self.assertEqual(model_id, 'org/model')
+        self.assertTrue(options['local_files_only'])
+
+    def test_entry_options_are_passed_to_the_backend(self):
+        register_model('embedding-model', 'embedding', path=self.checkpoint_dir, calibration=(0.2, 5.0))
+        backend_name, _, options = nlp_backend_config(model_name='embedding-model')
+        self.assertEqual(backend_name, 'embedding')
+        self.assertEqual(options['calibration'], (0.2, 5.0))
+
+    def test_unknown_model_is_rejected(self):
+        with self.assertRaises(ValueError):
+            nlp_backend_config(model_name='no-such-model')
+
+
+class BackendSelectionTests(SimpleTestCase):
+    """Backend selection errors and the rule-based fallback"""
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_backend('no-such-backend', 'org/model', MEDICAL_DISEASES)
+
+    def test_unknown_precision_is_rejected_before_loading(self):
+        with self.assertRaises(ValueError):
+            create_backend('zero-shot', 'org/model', MEDICAL_DISEASES, precision='fp8')
+
+    def assertRuleBased(self, predictor):
+        predictions = predictor.predict_diseases([PATIENT])[0]
+        self.assertTrue(predictions)
+        self.assertEqual({prediction['model'] for prediction in predictions}, {'Rule-based'})
+
+    @mock.patch.object(disease_predictor, 'HUGGINGFACE_AVAILABLE', True)
+    @mock.patch.object(disease_predictor, 'create_backend', side_effect=OSError('checkpoint not found'))
+    def test_failed_model_load_falls_back_to_rules(self, create):
+        with override_settings(HF_MODEL_SERVER_SOCKET=None, HF_IDLE_TIMEOUT=0):
+            predictor = DiseasePredictor(model_loading='now')
+        create.assert_called_once()
+        self.assertEqual(predictor.hf_predictor.status(), 'failed')
+        self.assertRuleBased(predictor)
+
+    @mock.patch.object(disease_predictor, 'HUGGINGFACE_AVAILABLE', True)
+    @mock.patch.object(disease_predictor, 'create_backend')
+    def test_unknown_model_name_falls_back_to_rules(self, create):
+        with override_settings(HF_MODEL_NAME='no-such-model', HF_MODEL_SERVER_SOCKET=None, HF_IDLE_TIMEOUT=0):
+            predictor = DiseasePredictor(model_loading='now')
+        create.assert_not_called()
+        self.assertEqual(predictor.hf_predictor.status(), 'failed')
+        self.assertRuleBased(predictor)
+
+
+@skipUnless(NLP_STACK_INSTALLED, 'torch and transformers are not installed')
+class TinyModelTests(SimpleTestCase):
+    """The Hugging Face path end to end, offline, on tiny randomly initialized checkpoints"""
+
+    texts = [
+        'Patient age 62 years. Gender Male. Blood pressure 150/95. Glucose level 180 mg/dL.',
+        'Short note.',
+        'Shortness of breath at night, loud snoring and daytime fatigue reported by the patient.',
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.checkpoint_dir = tempfile.mkdtemp()
+        register_tiny_model(os.path.join(cls.checkpoint_dir, 'zero-shot'), name='tiny-zero-shot')
+        register_tiny_model(
+            os.path.join(cls.checkpoint_dir, 'embedding'), name='tiny-embedding', backend='embedding'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        unregister_model('tiny-zero-shot')
+        unregister_model('tiny-embedding')
+        shutil.rmtree(cls.checkpoint_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def load(self, model_name):
+        with override_settings(HF_MODEL_NAME=model_name):
+            backend_name, model_id, options = nlp_backend_config()
+        self.assertTrue(options['local_files_only'])
+        return create_backend(backend_name, model_id, MEDICAL_DISEASES, **options)
+
+    def assertScores(self, backend):
+        results = backend.classify_batches(self.texts, MEDICAL_DISEASES, batch_size=4, max_tokens=512)
+        self.assertEqual(len(results), len(self.texts))
+        for result in results:
+            self.assertCountEqual(result['labels'], MEDICAL_DISEASES)
+            self.assertEqual(result['scores'], sorted(result['scores'], reverse=True))
+            self.assertTrue(all(0.0 <= score <= 1.0 for score in result['scores']))
+
+        stats = backend.load_stats
+        self.assertGreater(stats['parameters'], 0)
+        self.assertGreater(stats['rss_mb'], 0)
+        self.assertIsNotNone(stats['load_seconds'])
+
+    def test_zero_shot_backend_scores_through_the_registry(self):
+        backend = self.load('tiny-zero-shot')
+        self.assertIsInstance(backend, ZeroShotBackend)
+        self.assertScores(backend)
+
+    def test_embedding_backend_scores_through_the_registry(self):
+        backend = self.load('tiny-embedding')
+        self.assertIsInstance(backend, EmbeddingBackend)
+        self.assertScores(backend)
+
+    def test_predictor_uses_the_selected_model(self):
+        with override_settings(HF_MODEL_NAME='tiny-embedding', HF_MODEL_SERVER_SOCKET=None, HF_IDLE_TIMEOUT=0):
+            predictor = DiseasePredictor(model_loading='now')
+        self.assertEqual(predictor.hf_predictor.status(), 'ready')
+        self.assertEqual(predictor.hf_predictor.backend_name, 'embedding')
+        predictions = predictor.predict_diseases([PATIENT])[0]
+        self.assertIn('Hugging Face', {prediction['model'] for prediction in predictions})
+
+
+class WarmupTests(SimpleTestCase):
+    """Background warmup, readiness and forking"""
+
+    @skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    @mock.patch.dict(disease_predictor._warmup, {'started': True, 'rules_ready': False, 'seconds': None})
+    def test_forked_child_finishes_a_warmup_interrupted_by_the_fork(self):
+        # As if the parent's warmup thread was building the predictor when the server forked
+        with disease_predictor._predictor_lock, disease_predictor._warmup_lock:
+            pid = os.fork()
+        if pid == 0:
+            ready = False
+            try:
+                disease_predictor.start_warmup()
+                deadline = time.monotonic() + 30
+                while not ready and time.monotonic() < deadline:
+                    ready = disease_predictor.readiness()['ready']
+                    time.sleep(0.05)
+            finally:
+                os._exit(0 if ready else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+    @mock.patch.dict(disease_predictor._warmup, {'started': False, 'rules_ready': False, 'seconds': None})
+    def test_requests_start_the_warmup_only_when_enabled(self):
+        with mock.patch.object(disease_predictor, 'start_warmup') as start_warmup:
+            with override_settings(HF_WARMUP=False):
+                self.client.get('/healthz/')
+            start_warmup.assert_not_called()
+            with override_settings(HF_WARMUP=True):
+                self.client.get('/healthz/')
+            start_warmup.assert_called_once()
+
+
+class FakeModel:
+    """Stands in for a loaded HuggingFaceMedicalPredictor: one High Diabetes prediction per text, slowly"""
+
+    models_loaded = True
+
+    def __init__(self, seconds_per_call=0.01):
+        self.seconds_per_call = seconds_per_call
+        self.calls = []
+
+    @staticmethod
+    def results(texts):
+        return [[{'disease': 'Diabetes', 'confidence': 90, 'risk': 'High', 'text': text}] for text in texts]
+
+    def predict_batch_with_medical_nlp(self, texts, candidates=None):
+        self.calls.append(list(texts))
+        time.sleep(self.seconds_per_call)
+        return self.results(texts)
+
+    def ensure_loaded(self):
+        return True
+
+    def status(self):
+        return 'ready'
+
+    def backend_stats(self):
+        return {}
+
+
+class ModelServerTests(SimpleTestCase):
+    """Micro-batching on the shared model server"""
+
+    def test_small_request_is_not_stuck_behind_a_large_one(self):
+        model = FakeModel()
+        batcher = MicroBatcher(model, max_batch=8, max_wait=0.001)
+        self.addCleanup(batcher.close)
+        big = [f'big {i}' for i in range(200)]
+        small = ['small 0', 'small 1']
+        finished = {}
+
+        def submit(name, texts):
+            finished[name] = (batcher.submit(texts, timeout=30), time.monotonic())
+
+        big_thread = threading.Thread(target=submit, args=('big', big))
+        big_thread.start()
+        while not model.calls:
+            time.sleep(0.001)
+        submit('small', small)
+        big_thread.join()
+
+        self.assertTrue(all(len(call) <= 8 for call in model.calls))
+        self.assertLess(finished['small'][1], finished['big'][1])
+        # The small request rode along within the first few calls, not after all 25 of the big one
+        first_small_call = next(i for i, call in enumerate(model.calls) if 'small 0' in call)
+        self.assertLessEqual(first_small_call, 2)
+        self.assertEqual(finished['small'][0], model.results(small))
+        self.assertEqual(finished['big'][0], model.results(big))
+
+    def test_client_sends_max_batch_slices(self):
+        model = FakeModel(seconds_per_call=0)
+        socket_path = os.path.join(tempfile.mkdtemp(), 'model.sock')
+        self.addCleanup(shutil.rmtree, os.path.dirname(socket_path), ignore_errors=True)
+        server = ModelServer(socket_path, model, max_batch=8, max_wait=0.001)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        client = RemoteMedicalPredictor(socket_path, timeout=5.0, max_batch=5)
+        texts = [f'text {i}' for i in range(23)]
+        self.assertEqual(client.predict_batch_with_medical_nlp(texts), model.results(texts))
+        self.assertEqual([len(call) for call in model.calls], [5, 5, 5, 5, 3])
+
+
+class TimeBudgetTests(SimpleTestCase):
+    """Deadline-aware prediction: rows the model could not reach in time keep their rule predictions"""
+
+    def test_rows_past_the_budget_fall_back_to_rules_and_are_reported(self):
+        with override_settings(HF_MODEL_SERVER_SOCKET=None, PREDICTION_BUDGET_SLICE_ROWS=4):
+            predictor = DiseasePredictor(model_loading='deferred')
+        predictor.hf_predictor = FakeModel(seconds_per_call=0.05)
+        rows = [dict(PATIENT, age=30 + i) for i in range(40)]
+
+        with mock.patch.object(disease_predictor, '_predictor', predictor):
+            result = disease_predictor.predict_from_csv(rows, chunk_size=16, time_budget=0.3)
+
+        report = result['time_budget']
+        self.assertTrue(report['exhausted'])
+        model_rows = result['model_row_ranges']
+        # The model scored a prefix of the upload (across chunks) in slices of 4; the rest fell back
+        self.assertEqual(len(model_rows['Hugging Face']), 1)
+        [[start, scored]] = model_rows['Hugging Face']
+        self.assertEqual(start, 0)
+        self.assertEqual(scored % 4, 0)
+        self.assertEqual(model_rows['Rule-based'], [[scored, 40]])
+        self.assertEqual(report['fallback_row_ranges'], [[scored, 40]])
+        self.assertEqual(report['fallback_rows'], 40 - scored)
+        self.assertEqual(report['fallback_from_row'], scored)
+        self.assertEqual(result['models'], {'Rule-based': 40 - scored, 'Hugging Face': scored})
+
+    def test_no_budget_scores_every_row_with_the_model(self):
+        with override_settings(HF_MODEL_SERVER_SOCKET=None):
+            predictor = DiseasePredictor(model_loading='deferred')
+        predictor.hf_predictor = FakeModel(seconds_per_call=0)
+
+        with mock.patch.object(disease_predictor, '_predictor', predictor):
+            result = disease_predictor.predict_from_csv([PATIENT] * 10, chunk_size=4)
+
+        self.assertNotIn('time_budget', result)
+        self.assertEqual(result['model_row_ranges'], {'Hugging Face': [[0, 10]]})
+
+
+class RuleEngineParityTests(SimpleTestCase):
+    """The compiled rule engine reproduces the original per-patient rule code"""
+
+    # (disease, confidence, risk) from the original _rule_based_prediction, for normalized feature vectors
+    EXPECTED = [
+        ([1.2, 1.0, 0.6, 0.4, 1.5], [
+            ('Diabetes', 100, 'High'), ('Kidney Disease', 100, 'High'), ('Sleep Apnea', 100, 'High'),
+            ('Arthritis', 100, 'High'), ('Cancer Risk', 100, 'High'), ('Obesity', 99, 'High'),
+            ('Liver Disease', 94, 'High'), ('COPD', 93, 'High'), ('Hypertension', 75, 'Medium'),
+            ('Asthma', 72, 'Medium'), ('Stroke Risk', 68, 'Medium'), ('Thyroid Disorder', 66, 'Medium'),
+            ('Heart Disease', 63, 'Medium'), ('Anxiety', 45, 'Medium'), ('Depression', 44, 'Low'),
+        ]),
+        ([0.0, 0.0, 0.0, 0.0, 0.0], [
+            ('Depression', 80, 'High'), ('Anxiety', 75, 'Medium'), ('Asthma', 64, 'Medium'),
+            ('Thyroid Disorder', 42, 'Low'), ('Obesity', 25, 'Low'), ('COPD', 15, 'Low'),
+            ('Sleep Apnea', 10, 'Low'), ('Cancer Risk', 10, 'Low'), ('Diabetes', 8, 'Low'),
+            ('Heart Disease', 8, 'Low'), ('Hypertension', 8, 'Low'), ('Stroke Risk', 8, 'Low'),
+            ('Kidney Disease', 8, 'Low'), ('Arthritis', 8, 'Low'), ('Liver Disease', 8, 'Low'),
+        ]),
+        ([0.3, -1.0, 1.4, 1.1, -0.2], [
+            ('Heart Disease', 100, 'High'), ('Hypertension', 100, 'High'), ('Stroke Risk', 100, 'High'),
+            ('Asthma', 82, 'High'), ('Depression', 71, 'Medium'), ('Anxiety', 67, 'Medium'),
+            ('Thyroid Disorder', 57, 'Medium'), ('Obesity', 55, 'Medium'), ('Cancer Risk', 52, 'Medium'),
+            ('Kidney Disease', 51, 'Medium'), ('Liver Disease', 48, 'Medium'), ('Sleep Apnea', 41, 'Low'),
+            ('COPD', 34, 'Low'), ('Arthritis', 25, 'Low'), ('Diabetes', 12, 'Low'),
+        ]),
+    ]
+
+    def test_rule_predictions_match_the_original_rules(self):
+        predictor = rules_only_predictor()
+        for features, expected in self.EXPECTED:
+            with self.subTest(features=features):
+                predictions = predictor._rule_based_prediction(features)
+                self.assertEqual([(p['disease'], p['confidence'], p['risk']) for p in predictions], expected)
+                self.assertEqual({p['model'] for p in predictions}, {'Rule-based'})
+
+    def test_chunked_upload_matches_a_single_chunk(self):
+        predictor = rules_only_predictor()
+        with mock.patch.object(disease_predictor, '_predictor', predictor):
+            whole = disease_predictor.predict_from_csv(PATIENTS, chunk_size=1000)
+            chunked = disease_predictor.predict_from_csv(PATIENTS, chunk_size=7)
+        self.assertEqual(chunked['memoization']['chunks'], 9)
+        for result in (whole, chunked):
+            del result['memoization']
+        self.assertEqual(chunked, whole)
+        self.assertEqual(whole['total_patients'], len(PATIENTS))
+
+
+class StreamingTests(SimpleTestCase):
+    """predict_from_csv consumes any row iterator in bounded chunks"""
+
+    def test_iterator_is_scored_in_chunks(self):
+        predictor = rules_only_predictor()
+        with mock.patch.object(disease_predictor, '_predictor', predictor):
+            expected = disease_predictor.predict_from_csv(PATIENTS, chunk_size=1000)
+            with mock.patch.object(predictor, 'predict_batch', wraps=predictor.predict_batch) as predict_batch:
+                streamed = disease_predictor.predict_from_csv(iter(PATIENTS), chunk_size=16)
+        self.assertEqual([len(call.args[0]) for call in predict_batch.call_args_list], [16, 16, 16, 12])
+        for result in (expected, streamed):
+            del result['memoization']
+        self.assertEqual(streamed, expected)
+
+
+class MemoizationTests(SimpleTestCase):
+    """Repeated vitals are scored once and scattered back to every row"""
+
+    def test_deduplicated_rows_match_scoring_every_row(self):
+        stats = {}
+        batch = rules_only_predictor().predict_batch(PATIENTS, stats=stats)
+        unmemoized = rules_only_predictor(PREDICTION_DEDUPE_ROWS=False).predict_batch(PATIENTS)
+
+        self.assertEqual(stats['rows'], 60)
+        self.assertEqual(stats['unique_profiles'], 23)
+        self.assertEqual(batch.to_dicts(), unmemoized.to_dicts())
+        # Row 30 repeats row 7: the scatter hands it the same profile
+        self.assertEqual(batch.to_dicts()[30], batch.to_dicts()[7])
+
+    def test_lookup_table_hits_give_the_same_predictions(self):
+        predictor = rules_only_predictor()
+        expected = predictor.predict_batch(PATIENTS).to_dicts()
+        with mock.patch.object(disease_predictor, 'get_risk_lookup_table', return_value=RiskLookupTable(100)):
+            cold_stats, warm_stats = {}, {}
+            cold = predictor.predict_batch(PATIENTS, stats=cold_stats)
+            warm = predictor.predict_batch(PATIENTS, stats=warm_stats)
+        self.assertEqual((cold_stats['lookup_hits'], warm_stats['lookup_hits']), (0, 23))
+        self.assertEqual(cold.to_dicts(), expected)
+        self.assertEqual(warm.to_dicts(), expected)
+
+
+class AggregationTests(SimpleTestCase):
+    """The vectorized aggregate matches a plain per-row reduction, whole or merged from chunks"""
+
+    def test_aggregate_matches_a_per_row_reduction(self):
+        batch = rules_only_predictor().predict_batch(PATIENTS)
+        aggregate = RiskAggregate.from_batch(batch)
+
+        counts = {}
+        worst = {}
+        for row in batch.to_dicts():
+            for prediction in row:
+                disease = prediction['disease']
+                counts.setdefault(disease, dict.fromkeys(('Low', 'Medium', 'High'), 0))[prediction['risk']] += 1
+                rank = (('Low', 'Medium', 'High').index(prediction['risk']), prediction['confidence'])
+                if disease not in worst or rank > worst[disease][0]:
+                    worst[disease] = (rank, prediction)
+
+        self.assertEqual(aggregate.patients, 60)
+        self.assertEqual(aggregate.risk_matrix(), counts)
+        self.assertEqual(
+            aggregate.risk_totals(),
+            {level: sum(row[level] for row in counts.values()) for level in ('Low', 'Medium', 'High')},
+        )
+        self.assertEqual(
+            {p['disease']: p for p in aggregate.predictions()},
+            {disease: prediction for disease, (_, prediction) in worst.items()},
+        )
+
+    def test_merged_chunks_match_the_whole_batch(self):
+        predictor = rules_only_predictor()
+        whole = RiskAggregate.from_batch(predictor.predict_batch(PATIENTS))
+        merged = RiskAggregate()
+        for start in range(0, len(PATIENTS), 25):
+            chunk = predictor.predict_batch(PATIENTS[start:start + 25])
+            merged.merge(RiskAggregate.from_batch(chunk, offset=start))
+
+        self.assertEqual(merged.patients, whole.patients)
+        self.assertEqual(merged.risk_matrix(), whole.risk_matrix())
+        self.assertEqual(merged.mean_confidence(), whole.mean_confidence())
+        self.assertEqual(merged.predictions(), whole.predictions())
+
+
+class RuleCatalogTests(SimpleTestCase):
+    """Versioned rule catalog: hot reload, version lookup and reasoning for unknown versions"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(rule_engine.DEFAULT_RULES_PATH, encoding='utf-8') as f:
+            self.rules = json.load(f)
+        self.path = os.path.join(directory, 'disease_rules.json')
+        self.writes = 0
+        self.write(self.rules)
+        self.catalog = rule_engine.RuleCatalog(self.path, reload_interval=0)
+
+    def write(self, rules):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(rules if isinstance(rules, str) else json.dumps(rules))
+        # A distinct mtime per write, even on filesystems with coarse timestamps
+        self.writes += 1
+        stamp = time.time_ns() + self.writes * 10 ** 9
+        os.utime(self.path, ns=(stamp, stamp))
+
+    def edited_rules(self, version):
+        rules = json.loads(json.dumps(self.rules))
+        rules['version'] = version
+        rules['diseases'][0]['intercept'] = 0.3
+        return rules
+
+    def test_edited_catalog_is_reloaded_and_old_versions_stay_available(self):
+        original = self.catalog.get()
+        features = np.array([[0.0, 0.0, 0.0, 0.0, 0.0]])
+        self.write(self.edited_rules('2'))
+
+        edited = self.catalog.get()
+        self.assertEqual(edited.version, '2')
+        self.assertNotEqual(edited.fingerprint, original.fingerprint)
+        self.assertAlmostEqual(edited.score(features)[0, 0], original.score(features)[0, 0] + 0.3)
+        self.assertIs(self.catalog.get_version(original.version), original)
+        self.assertIsNone(self.catalog.get_version('no-such-version'))
+
+    def test_broken_catalog_keeps_the_previous_version(self):
+        original = self.catalog.get()
+        self.write('{"version": "3", "diseases": ')
+        self.assertIs(self.catalog.get(), original)
+
+    def test_reasoning_is_skipped_for_an_unknown_version_unless_stored(self):
+        engine = self.catalog.get()
+        batch = rules_only_predictor().predict_batch([PATIENT], rule_engine=engine)
+        prediction = batch.to_dicts()[0][0]
+
+        with mock.patch.object(rule_engine, '_catalog', self.catalog):
+            self.assertTrue(rule_engine.render_reasoning(prediction, engine.version))
+            self.assertIsNone(rule_engine.render_reasoning(prediction, 'no-such-version'))
+            stored = dict(prediction, reasoning='Stored when the analysis was saved')
+            self.assertEqual(rule_engine.render_reasoning(stored, 'no-such-version'), stored['reasoning'])
@@ -0,0 +1,79 @@
+"""
+Per-Request Latency Budget
+A request gets a fixed number of seconds. Model work is done in slices, and
+before each slice the budget checks whether that slice (at the per-row time
+measured so far) would still finish before a reserve is reached. Once it would
+not, the remaining patients keep their rule-based predictions, which are
+already computed, so the response time stays bounded whatever the upload
+size or model speed.
+"""
+
+import time
+
+from .prediction_batch import extend_ranges, row_ranges
+
+# Share of the budget kept back for aggregation and the response
+DEFAULT_RESERVE = 0.1
+
+
+class TimeBudget:
+    """
+    Deadline for one request
+
+    Attributes:
+        seconds: Total budget
+        reserve: Seconds kept back for work after model scoring
+        row_seconds: Smoothed model time per row (None until the first slice)
+        fallback_rows: Rows left to the rule engine because the budget ran out
+        fallback_from_row: First patient index (within the upload) that fell back
+        fallback_row_ranges: [start, end) upload row ranges that fell back
+    """
+
+    def __init__(self, seconds, reserve=DEFAULT_RESERVE):
+        self.seconds = float(seconds)
+        self.reserve = self.seconds * reserve
+        self.started = time.monotonic()
+        self.row_seconds = None
+        self.fallback_rows = 0
+        self.fallback_from_row = None
+        self.fallback_row_ranges = []
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return self.seconds - self.elapsed()
+
+    def allows(self, rows):
+        """Whether `rows` more rows of model work should finish before the reserve"""
+        estimate = (self.row_seconds or 0.0) * rows
+        return self.remaining() - estimate > self.reserve
+
+    def record(self, rows, seconds):
+        """Update the per-row estimate with one finished slice"""
+        if rows <= 0:
+            return
+        latest = seconds / rows
+        self.row_seconds = latest if self.row_seconds is None else (self.row_seconds + latest) / 2
+
+    def fall_back(self, rows):
+        """Note rows handed to the rule engine (sorted upload row indexes)"""
+        if not len(rows):
+            return
+        self.fallback_rows += len(rows)
+        if self.fallback_from_row is None:
+            self.fallback_from_row = int(rows[0])
+        extend_ranges(self.fallback_row_ranges, row_ranges(rows))
+
+    def report(self):
+        elapsed = self.elapsed()
+        return {
+            'budget_seconds': self.seconds,
+            'elapsed_seconds': round(elapsed, 3),
+            'used_fraction': round(elapsed / self.seconds, 4) if self.seconds else 0.0,
+            'exhausted': self.fallback_rows > 0,
+            'fallback_rows': self.fallback_rows,
+            'fallback_from_row': self.fallback_from_row,
+            'fallback_row_ranges': self.fallback_row_ranges,
+            'model_seconds_per_row': round(self.row_seconds, 6) if self.row_seconds is not None else None,
+        }
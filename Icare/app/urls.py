@@ -8,6 +8,9 @@ urlpatterns=[
     path('logout/',views.logout_view,name='logout'),
     path('dashboard/',views.dashboard,name='dashboard'),
     path('analysis/<int:analysis_id>/',views.analysis_detail,name='analysis_detail'),
+    path('analysis/<int:analysis_id>/what-if/',views.analysis_what_if,name='analysis_what_if'),
     path('analysis-history/',views.analysis_history,name='analysis_history'),
     path('delete-analysis/<int:analysis_id>/',views.delete_analysis,name='delete_analysis'),
+    path('healthz/',views.healthz,name='healthz'),
+    path('readyz/',views.readyz,name='readyz'),
 ]
\ No newline at end of file
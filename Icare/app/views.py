@@ -4,8 +4,8 @@ import logging
 from django.contrib.auth import login,logout,authenticate
 import csv
 import json
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from .disease_predictor import predict_from_csv
 import io
 from django.http import JsonResponse
 from datetime import datetime
@@ -241,8 +241,14 @@ def dashboard(request):
             
             # ============ DISEASE PREDICTION ============
             try:
+                # The ML stack (numpy, pandas, the NLP model) loads on first prediction, not at URLconf import
+                from .disease_predictor import predict_from_csv
+                
                 logger.info(f"[CSV_UPLOAD] Starting disease prediction for {len(medical_data)} records...")
-                prediction_results = predict_from_csv(medical_data)
+                # Optionally bounded (settings.PREDICTION_TIME_BUDGET) so a slow model or a large file cannot hold the worker
+                prediction_results = predict_from_csv(
+                    medical_data, time_budget=getattr(settings, 'PREDICTION_TIME_BUDGET', None)
+                )
                 logger.info(f"[CSV_UPLOAD] ✓ Prediction complete. Total diseases analyzed: {prediction_results['total_diseases']}")
                 
             except Exception as e:
@@ -257,6 +263,13 @@ def dashboard(request):
                 disease_names = [str(p['disease']) for p in formatted_predictions]
                 disease_confidences = [float(p['confidence']) for p in formatted_predictions]
                 
+                # Render reasoning now, with the catalog version that scored the upload, and store the
+                # text: other workers, a restarted server or an edited catalog may not have that version
+                from .rule_engine import attach_reasoning
+                for prediction in attach_reasoning(prediction_results['predictions'], prediction_results.get('rule_version')):
+                    if prediction.get('reasoning'):
+                        prediction.pop('contributions', None)
+                
                 logger.info(f"[CSV_UPLOAD] Saving analysis results to database...")
                 analysis_result = AnalysisResult.objects.create(
                     medical_report=medical_report,
@@ -267,7 +280,8 @@ def dashboard(request):
                     medium_risk_count=prediction_results['medium_risk_count'],
                     low_risk_count=prediction_results['low_risk_count'],
                     average_confidence=prediction_results['avg_confidence'],
-                    predictions_json=prediction_results
+                    predictions_json=prediction_results,
+                    rule_version=prediction_results.get('rule_version')
                 )
                 logger.info(f"[CSV_UPLOAD] ✓ Analysis result saved with ID: {analysis_result.id}")
                 
@@ -383,12 +397,13 @@ def analysis_detail(request, analysis_id):
         # Get all possible diseases and their risks for the patient
         all_predictions = analysis.predictions_json.get('predictions', [])
         
-        # Enrich predictions with precaution data
-        enriched_predictions = get_precautions_for_predictions(all_predictions)
+        # Enrich predictions with precaution data (and reasoning for analyses saved with contribution records only)
+        from .rule_engine import attach_reasoning
+        enriched_predictions = get_precautions_for_predictions(attach_reasoning(all_predictions, analysis.rule_version))
         
         # If not all diseases are present, fill in missing ones as 'Low' risk, 0 confidence
-        from .disease_predictor import DiseasePredictor
-        all_disease_names = DiseasePredictor().disease_categories
+        from .disease_predictor import DISEASE_CATEGORIES
+        all_disease_names = DISEASE_CATEGORIES
         disease_risk_map = {p['disease']: p['risk'] for p in all_predictions}
         disease_conf_map = {p['disease']: p['confidence'] for p in all_predictions}
         all_disease_risks = [disease_risk_map.get(d, 'Low') for d in all_disease_names]
@@ -433,6 +448,47 @@ def analysis_detail(request, analysis_id):
         return redirect('dashboard')
 
 
+# Vitals the what-if endpoint accepts (same columns as the CSV upload)
+WHAT_IF_FIELDS = ('age', 'gender', 'blood_pressure', 'cholesterol', 'glucose')
+
+
+@login_required(login_url='login')
+def analysis_what_if(request, analysis_id):
+    """
+    Re-score edited vitals for an analysis ("what if my glucose were 95?")
+    
+    Accepts the vitals as query parameters, form fields or a JSON body; any
+    vital not supplied falls back to the report's stored value.
+    """
+    try:
+        analysis = AnalysisResult.objects.select_related('medical_report').get(id=analysis_id, user=request.user)
+    except AnalysisResult.DoesNotExist:
+        return JsonResponse({'error': 'Analysis not found'}, status=404)
+    
+    if request.method == 'POST' and request.content_type == 'application/json':
+        try:
+            submitted = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        if not isinstance(submitted, dict):
+            return JsonResponse({'error': 'JSON body must be an object'}, status=400)
+    else:
+        submitted = request.POST if request.method == 'POST' else request.GET
+    
+    summary = analysis.medical_report.get_medical_summary()
+    vitals = {field: summary[field] for field in WHAT_IF_FIELDS if summary.get(field) not in (None, '')}
+    vitals.update({field: submitted[field] for field in WHAT_IF_FIELDS if field in submitted})
+    
+    from .disease_predictor import score_single_patient
+    predictions = score_single_patient(vitals)
+    
+    return JsonResponse({
+        'analysis_id': analysis.id,
+        'vitals': {field: vitals.get(field) for field in WHAT_IF_FIELDS},
+        'predictions': predictions,
+    })
+
+
 @login_required(login_url='login')
 def analysis_history(request):
     """View all analysis history with pagination and search"""
@@ -518,4 +574,23 @@ def delete_analysis(request, analysis_id):
         logger.info(f"Analysis {analysis_id} deleted by {request.user.email}")
         return redirect('dashboard')
     except AnalysisResult.DoesNotExist:
-        return redirect('dashboard')
\ No newline at end of file
+        return redirect('dashboard')
+
+
+def healthz(request):
+    """Liveness probe: the process is up and serving requests"""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """
+    Readiness probe for the load balancer
+    
+    503 while the predictor warms up or the NLP model is still loading (uploads
+    would be rules-only); 200 once warm, or degraded to rules if the model
+    cannot load.
+    """
+    from .disease_predictor import readiness
+    
+    state = readiness()
+    return JsonResponse(state, status=200 if state['ready'] else 503)
@@ -0,0 +1,221 @@
+"""
+Two-Level Zero-Shot Result Cache
+Identical clinical texts (repeated notes, summaries generated from the same
+vitals, re-uploaded reports) are classified once. Results are kept in an
+in-process LRU backed by a size-bounded SQLite file shared by all workers,
+keyed by a hash of the normalized text, the candidate labels and the model id.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_ENTRIES = 10000
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace (case is kept: the model is case-sensitive)"""
+    return ' '.join(unicodedata.normalize('NFC', str(text)).split())
+
+
+def cache_key(text, labels, model_id):
+    """Stable key for one (text, candidate labels, model) classification"""
+    payload = '\x1e'.join([model_id, '\x1f'.join(labels), normalize_text(text)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ZeroShotCache:
+    """
+    In-process LRU in front of an optional SQLite store
+
+    Values are the raw {'labels', 'scores'} pipeline outputs, so changing how
+    predictions are formatted never invalidates the cache.
+    """
+
+    def __init__(self, path=None, memory_entries=DEFAULT_MEMORY_ENTRIES, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.path = str(path) if path else None
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS zero_shot_results ('
+                    'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+                )
+                self._connection.execute(
+                    'CREATE INDEX IF NOT EXISTS zero_shot_results_accessed ON zero_shot_results (accessed)'
+                )
+                self._connection.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Zero-shot disk cache unavailable ({self.path}): {e}")
+                self._connection = None
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        Look up cached results
+
+        Returns:
+            Dict of key -> result for the keys that were found
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._memory.get(key)
+                if value is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = value
+            self.memory_hits += len(found)
+
+            missing = [key for key in keys if key not in found]
+            if missing and self._connection is not None:
+                try:
+                    rows = []
+                    for start in range(0, len(missing), 500):
+                        part = missing[start:start + 500]
+                        rows.extend(self._connection.execute(
+                            f"SELECT key, value FROM zero_shot_results WHERE key IN ({','.join('?' * len(part))})",
+                            part,
+                        ).fetchall())
+                    if rows:
+                        self._connection.executemany(
+                            'UPDATE zero_shot_results SET accessed = ? WHERE key = ?',
+                            [(time.time(), key) for key, _ in rows],
+                        )
+                        self._connection.commit()
+                    for key, value in rows:
+                        result = json.loads(value)
+                        found[key] = result
+                        self._remember(key, result)
+                    self.disk_hits += len(rows)
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Zero-shot disk cache read failed: {e}")
+
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items):
+        """Store new results (dict of key -> result), evicting least recently used entries"""
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+
+            if self._connection is None:
+                return
+            try:
+                now = time.time()
+                rows = []
+                for key, value in items.items():
+                    encoded = json.dumps(value)
+                    rows.append((key, encoded, len(encoded), now))
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO zero_shot_results (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                    rows,
+                )
+                self._evict()
+                self._connection.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Zero-shot disk cache write failed: {e}")
+
+    def _evict(self):
+        """Drop least recently used rows until the store is back under 90% of its size limit"""
+        total = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM zero_shot_results').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        target = self.max_disk_bytes * 0.9
+        freed = 0
+        stale = []
+        for key, size in self._connection.execute('SELECT key, size FROM zero_shot_results ORDER BY accessed'):
+            if total - freed <= target:
+                break
+            stale.append((key,))
+            freed += size
+        self._connection.executemany('DELETE FROM zero_shot_results WHERE key = ?', stale)
+        logger.info(f"🧹 Zero-shot disk cache evicted {len(stale)} entries ({freed} bytes)")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM zero_shot_results')
+                self._connection.commit()
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        disk_entries = 0
+        if self._connection is not None:
+            with self._lock:
+                disk_entries = self._connection.execute('SELECT COUNT(*) FROM zero_shot_results').fetchone()[0]
+        return {
+            'memory_entries': len(self._memory),
+            'disk_entries': disk_entries,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_zero_shot_cache():
+    """
+    Get the process-wide ZeroShotCache, or None when disabled
+
+    Configured by settings.HF_CACHE_ENABLED, HF_CACHE_PATH (None keeps the
+    cache in memory only), HF_CACHE_MEMORY_ENTRIES and HF_CACHE_MAX_BYTES.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    from django.conf import settings
+                    if not getattr(settings, 'HF_CACHE_ENABLED', True):
+                        return None
+                    path = getattr(settings, 'HF_CACHE_PATH', None)
+                    memory_entries = getattr(settings, 'HF_CACHE_MEMORY_ENTRIES', DEFAULT_MEMORY_ENTRIES)
+                    max_bytes = getattr(settings, 'HF_CACHE_MAX_BYTES', DEFAULT_DISK_BYTES)
+                except Exception:
+                    path, memory_entries, max_bytes = None, DEFAULT_MEMORY_ENTRIES, DEFAULT_DISK_BYTES
+                _cache = ZeroShotCache(path, memory_entries, max_bytes)
+                logger.info(f"✓ Zero-shot cache ready (memory: {memory_entries} entries, disk: {path or 'disabled'})")
+    return _cache
+
+
+def _reset_after_fork():
+    # A SQLite connection must not be shared across fork(); each worker opens its own
+    global _cache, _cache_lock
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)